@@ -0,0 +1,162 @@
+"""Receipt image uploads: the blocking Cloudinary SDK vs the pooled async client.
+
+    python benchmarks/bench_image_store.py receipt.jpg --uploads 64 \
+        --concurrency 16 --delay-ms 200 [--fail-rate 0.1]
+
+Both clients upload to a local stand-in for the Cloudinary upload API that
+sleeps --delay-ms per request and answers 503 for --fail-rate of them. It
+reports wall time, upload p50/p95, how many TCP connections were opened and
+the worst event loop stall seen by a 10 ms ticker while uploads ran.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cloudinary.uploader  # noqa: E402
+
+from benchmarks.bench_ocr_load import percentile  # noqa: E402
+from services.cloudinary_service import CloudinaryClient  # noqa: E402
+
+
+class FakeCloudinary(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    fail_rate = 0.0
+    connections: set = set()
+
+    def do_POST(self):
+        self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            body, status = b"{}", 503
+        else:
+            public_id = f"chiatien/receipts/{uuid.uuid4().hex}"
+            body = json.dumps(
+                {"public_id": public_id, "secure_url": f"https://example.invalid/{public_id}.jpg"}
+            ).encode()
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        # Admin API bulk delete: every id in the query string is "deleted"
+        self.connections.add(self.client_address)
+        time.sleep(self.delay)
+        query = parse_qs(urlparse(self.path).query)
+        body = json.dumps(
+            {"deleted": {public_id: "deleted" for public_id in query.get("public_ids[]", [])}}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def sdk_upload(prefix: str, image_data: bytes):
+    # What cloudinary_service did before: the SDK in a worker thread
+    await asyncio.to_thread(
+        cloudinary.uploader.upload,
+        image_data,
+        folder="chiatien/receipts",
+        resource_type="image",
+        upload_prefix=prefix,
+    )
+
+
+async def measure(name: str, upload, image_data: bytes, uploads: int, concurrency: int) -> dict:
+    FakeCloudinary.connections = set()
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+    failures = 0
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            start = loop.time()
+            await asyncio.sleep(0.01)
+            lag = max(lag, loop.time() - start - 0.01)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await upload(image_data)
+            except Exception:
+                failures += 1
+            timings.append(time.perf_counter() - start)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+
+    return {
+        "client": name,
+        "uploads": uploads,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "p50_ms": round(statistics.median(timings) * 1000, 1),
+        "p95_ms": round(percentile(timings, 95) * 1000, 1),
+        "connections": len(FakeCloudinary.connections),
+        "max_loop_stall_ms": round(lag * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay-ms", type=float, default=200)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_data = f.read()
+
+    FakeCloudinary.delay = args.delay_ms / 1000
+    FakeCloudinary.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCloudinary)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    prefix = f"http://127.0.0.1:{server.server_port}"
+
+    client = CloudinaryClient(
+        f"{prefix}/v1_1", "bench", "key", "secret", retry_backoff=0.05
+    )
+    results = [
+        await measure("sdk", partial(sdk_upload, prefix), image_data, args.uploads, args.concurrency),
+        await measure("pooled", client.upload, image_data, args.uploads, args.concurrency),
+    ]
+    await client.close()
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
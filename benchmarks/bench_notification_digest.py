@@ -0,0 +1,107 @@
+"""Push volume for bursts of expenses, with and without digest windows.
+
+    python benchmarks/bench_notification_digest.py --groups 20 --members 5 \
+        --expenses 10 --burst-seconds 2 --windows 0,5
+
+Needs DATABASE_URL. It creates --members temporary users, then for each
+window logs --expenses expenses in each of --groups groups over
+--burst-seconds (each notifies every member) and runs the outbox workers
+against the local Expo stand-in until everything is sent. Reports outbox
+rows, pushes and Expo requests made, and how long the last push waited.
+The temporary users and their outbox rows are deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fake_push_server import FakePushHandler, start_fake_push_server  # noqa: E402
+from database import connect_db, db, disconnect_db  # noqa: E402
+from services import notification_outbox, notification_service, push_client  # noqa: E402
+
+
+async def measure(window: float, users: list, args) -> dict:
+    notification_service.settings.notification_digest_window = window
+    FakePushHandler.requests = 0
+    FakePushHandler.messages = 0
+    user_ids = [user.id for user in users]
+    recipients = [(user.id, user.pushToken) for user in users]
+
+    await notification_outbox.start_outbox_workers()
+    outbox = notification_outbox.get_notification_outbox()
+    start = time.perf_counter()
+    for e in range(args.expenses):
+        for g in range(args.groups):
+            async with db.tx() as transaction:
+                await notification_service.notify_group_members(
+                    transaction, recipients, f"bench-group-{g}", f"Chi tiêu {e}", 125000, "Tuấn"
+                )
+        outbox.wake()
+        await asyncio.sleep(args.burst_seconds / args.expenses)
+    burst_end = time.perf_counter()
+
+    while await db.notificationoutbox.count(
+        where={"userId": {"in": user_ids}, "status": {"in": ["pending", "sending"]}}
+    ):
+        await asyncio.sleep(0.05)
+    drained = time.perf_counter()
+    await notification_outbox.stop_outbox_workers()
+    await db.notificationoutbox.delete_many(where={"userId": {"in": user_ids}})
+
+    rows = args.groups * args.expenses * len(users)
+    return {
+        "window_s": window,
+        "outbox_rows": rows,
+        "pushes": FakePushHandler.messages,
+        "expo_requests": FakePushHandler.requests,
+        "push_reduction": round(1 - FakePushHandler.messages / rows, 3),
+        "seconds": round(drained - start, 3),
+        "last_push_after_burst_s": round(drained - burst_end, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--expenses", type=int, default=10)
+    parser.add_argument("--burst-seconds", type=float, default=2)
+    parser.add_argument("--windows", default="0,5")
+    parser.add_argument("--delay-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server, url = start_fake_push_server(args.delay_ms)
+    push_client.settings.expo_push_host = url
+    notification_outbox.settings.notification_outbox_poll_interval = 0.1
+
+    await connect_db()
+    users = [
+        await db.user.create(
+            data={
+                "username": f"bench-{uuid.uuid4().hex[:12]}",
+                "password": "-",
+                "displayName": f"Bench {i}",
+                "pushToken": f"ExponentPushToken[bench-{uuid.uuid4().hex}]",
+            }
+        )
+        for i in range(args.members)
+    ]
+    try:
+        results = [
+            await measure(float(window), users, args) for window in args.windows.split(",")
+        ]
+    finally:
+        await db.user.delete_many(where={"id": {"in": [user.id for user in users]}})
+        await push_client.close_client()
+        await disconnect_db()
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""Push notification cost in expense creation, and outbox worker throughput.
+
+    python benchmarks/bench_notification_outbox.py --expenses 50 --members 5 \
+        --delay-ms 150 [--fail-rate 0.05]
+    python benchmarks/bench_notification_outbox.py --messages 2000 --user-id <id>
+
+Everything talks to the local Expo stand-in in fake_push_server.py. The
+first run times the inline send create_expense used to wait on (a new
+PushClient per expense). With --user-id it also needs DATABASE_URL: it
+queues --messages outbox rows (1% with unregistered tokens), runs the
+outbox workers until the table is drained and reports messages/sec.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from exponent_server_sdk import PushClient, PushMessage  # noqa: E402
+
+from benchmarks.bench_ocr_load import percentile  # noqa: E402
+from benchmarks.fake_push_server import FakePushHandler, start_fake_push_server  # noqa: E402
+from database import connect_db, db, disconnect_db  # noqa: E402
+from services import notification_outbox, notification_service  # noqa: E402
+
+
+def token(i: int) -> str:
+    return f"ExponentPushToken[{'Unregistered' if i % 100 == 99 else 'device'}-{i}]"
+
+
+def measure_inline(url: str, expenses: int, members: int) -> dict:
+    timings = []
+    failures = 0
+    for e in range(expenses):
+        messages = [
+            PushMessage(to=token(e * members + m), title="Chi tiêu mới 💸", body="bench")
+            for m in range(members)
+        ]
+        start = time.perf_counter()
+        try:
+            PushClient(host=url).publish_multiple(messages)
+        except Exception:
+            # Dropped for good: the old code only logged it
+            failures += 1
+        timings.append(time.perf_counter() - start)
+    return {
+        "inline_p50_ms": round(statistics.median(timings) * 1000, 1),
+        "inline_p95_ms": round(percentile(timings, 95) * 1000, 1),
+        "lost_sends": failures,
+        "connections": len(FakePushHandler.connections),
+    }
+
+
+async def measure_outbox(messages: int, user_id: str) -> dict:
+    await connect_db()
+    await db.notificationoutbox.create_many(
+        data=[
+            {"userId": user_id, "pushToken": token(i), "title": "Chi tiêu mới 💸", "body": "bench"}
+            for i in range(messages)
+        ]
+    )
+    FakePushHandler.requests = 0
+    FakePushHandler.connections = set()
+
+    start = time.perf_counter()
+    await notification_outbox.start_outbox_workers()
+    while await db.notificationoutbox.count(
+        where={"userId": user_id, "status": {"in": ["pending", "sending"]}}
+    ):
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    await notification_outbox.stop_outbox_workers()
+
+    dead = await db.notificationoutbox.count(where={"userId": user_id, "status": "dead"})
+    await db.notificationoutbox.delete_many(where={"userId": user_id})
+    await disconnect_db()
+    return {
+        "messages": messages,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(messages / elapsed, 1),
+        "sent": messages - dead,
+        "dead": dead,
+        "requests": FakePushHandler.requests,
+        "connections": len(FakePushHandler.connections),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--expenses", type=int, default=50)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=150)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--user-id")
+    args = parser.parse_args()
+
+    server, url = start_fake_push_server(args.delay_ms, args.fail_rate)
+    results = {"inline": measure_inline(url, args.expenses, args.members)}
+    if args.user_id:
+        notification_service.settings.expo_push_host = url
+        notification_outbox.settings.notification_outbox_retry_delay = 0.1
+        results["outbox"] = await measure_outbox(args.messages, args.user_id)
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
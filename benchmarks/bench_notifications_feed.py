@@ -0,0 +1,172 @@
+"""Notifications feed latency and query plans at a large table size.
+
+    python benchmarks/bench_notifications_feed.py --notifications 1000000 \
+        --users 100 --unread-ratio 0.3 --depth 100 --repeats 50 [--explain]
+
+Needs DATABASE_URL. It creates --users temporary users and spreads
+--notifications notifications across them with one INSERT ... SELECT from
+generate_series, then ANALYZEs the table. For the first user it times
+(p50/p95 ms) the newest page, the page --depth pages back reached by
+cursor and by OFFSET, the newest unread-only page and the old COUNT of
+unread rows. With --explain it prints EXPLAIN (ANALYZE, BUFFERS) for the
+equivalent SQL. Run it before and after `prisma db push` to compare plans
+without and with the Notification indexes. The users and their
+notifications are deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import Response  # noqa: E402
+
+from benchmarks.bench_ocr_load import percentile  # noqa: E402
+from database import connect_db, db, disconnect_db  # noqa: E402
+from routers.notifications import decode_cursor, get_notifications  # noqa: E402
+from services.auth_service import JwtPayload  # noqa: E402
+
+SEED_NOTIFICATIONS = """
+INSERT INTO "Notification" ("id", "userId", "type", "title", "body", "read", "createdAt")
+SELECT
+    'bench-' || $1 || '-' || g,
+    ($2::text[])[1 + g % array_length($2::text[], 1)],
+    'bench', 'Bench', 'Notification ' || g,
+    random() >= $3,
+    NOW() - g * INTERVAL '1 second'
+FROM generate_series(1, $4) g
+"""
+
+# The SQL Prisma sends for each request, for EXPLAIN
+FEED_SQL = """
+SELECT * FROM "Notification" WHERE "userId" = $1
+ORDER BY "createdAt" DESC, "id" DESC LIMIT $2
+"""
+CURSOR_SQL = """
+SELECT * FROM "Notification"
+WHERE "userId" = $1 AND "createdAt" <= $2::timestamp AND ("createdAt" < $2::timestamp OR "id" < $3)
+ORDER BY "createdAt" DESC, "id" DESC LIMIT $4
+"""
+OFFSET_SQL = """
+SELECT * FROM "Notification" WHERE "userId" = $1
+ORDER BY "createdAt" DESC, "id" DESC LIMIT $2 OFFSET $3
+"""
+UNREAD_SQL = """
+SELECT * FROM "Notification" WHERE "userId" = $1 AND NOT "read"
+ORDER BY "createdAt" DESC, "id" DESC LIMIT $2
+"""
+COUNT_SQL = """
+SELECT COUNT(*) FROM "Notification" WHERE "userId" = $1 AND NOT "read"
+"""
+
+
+async def timed(fn, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+    }
+
+
+async def explain(sql: str, *params) -> str:
+    rows = await db.query_raw("EXPLAIN (ANALYZE, BUFFERS) " + sql, *params)
+    return "\n".join(row["QUERY PLAN"] for row in rows)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--unread-ratio", type=float, default=0.3)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+
+    await connect_db()
+    run = uuid.uuid4().hex[:12]
+    users = [
+        await db.user.create(
+            data={"username": f"bench-{run}-{i}", "password": "-", "displayName": f"Bench {i}"}
+        )
+        for i in range(args.users)
+    ]
+    user_ids = [user.id for user in users]
+    current_user = JwtPayload(userId=user_ids[0], username=users[0].username)
+    try:
+        start = time.perf_counter()
+        await db.execute_raw(
+            SEED_NOTIFICATIONS, run, user_ids, args.unread_ratio, args.notifications
+        )
+        await db.execute_raw('ANALYZE "Notification"')
+        seeded = time.perf_counter() - start
+
+        async def page(cursor=None, unread_only=False):
+            response = Response()
+            await get_notifications(response, cursor, args.limit, unread_only, current_user)
+            return response.headers.get("X-Next-Cursor")
+
+        cursor = None
+        for _ in range(args.depth):
+            cursor = await page(cursor)
+            if cursor is None:
+                parser.error("--depth goes past the first user's last page")
+        deep_cursor = cursor
+
+        async def offset_page():
+            await db.notification.find_many(
+                where={"userId": current_user.userId},
+                order=[{"createdAt": "desc"}, {"id": "desc"}],
+                skip=args.depth * args.limit,
+                take=args.limit,
+            )
+
+        async def count_unread():
+            await db.notification.count(where={"userId": current_user.userId, "read": False})
+
+        results = {
+            "notifications": args.notifications,
+            "per_user": args.notifications // args.users,
+            "seed_seconds": round(seeded, 1),
+            "first_page": await timed(page, args.repeats),
+            f"page_{args.depth}_cursor": await timed(lambda: page(deep_cursor), args.repeats),
+            f"page_{args.depth}_offset": await timed(offset_page, args.repeats),
+            "unread_only_first_page": await timed(lambda: page(unread_only=True), args.repeats),
+            "unread_count_query": await timed(count_unread, args.repeats),
+        }
+
+        if args.explain:
+            created_at, notification_id = decode_cursor(deep_cursor)
+            # Prisma stores timestamp(3) without time zone, in UTC
+            created_at = created_at.replace(tzinfo=None).isoformat()
+            plans = {
+                "first_page": await explain(FEED_SQL, current_user.userId, args.limit),
+                "cursor_page": await explain(
+                    CURSOR_SQL, current_user.userId, created_at, notification_id, args.limit
+                ),
+                "offset_page": await explain(
+                    OFFSET_SQL, current_user.userId, args.limit, args.depth * args.limit
+                ),
+                "unread_only": await explain(UNREAD_SQL, current_user.userId, args.limit),
+                "unread_count": await explain(COUNT_SQL, current_user.userId),
+            }
+            for name, plan in plans.items():
+                print(f"--- {name}\n{plan}\n")
+    finally:
+        await db.user.delete_many(where={"id": {"in": user_ids}})
+        await disconnect_db()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""End-to-end receipt scan benchmark: latency, throughput, memory and accuracy.
+
+    python benchmarks/bench_ocr.py [--corpus path/to/corpus] [--count 50] \
+        [--concurrency 4] [--profile fast] [--backend onnx] [--output results.json]
+
+Every image goes through parse_receipt_image (worker pool, batcher,
+preprocessing, PaddleOCR and parse_receipt_text) with the result cache off.
+Without --corpus a synthetic corpus is generated first (see
+synthetic_receipts.py). Nothing is downloaded while it runs, but the PaddleOCR
+models have to be in ~/.paddleocr already: run the app or test_ocr.py once on
+a machine with network access, or copy that directory over.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_ocr_load import percentile  # noqa: E402
+from benchmarks.receipt_accuracy import load_corpus, score_receipt, summarize_scores  # noqa: E402
+from benchmarks.synthetic_receipts import generate  # noqa: E402
+from services import ocr_service  # noqa: E402
+from services.ocr_backends import BACKENDS  # noqa: E402
+
+
+def worker_peak_rss_mb() -> list[float]:
+    # VmHWM is the peak resident set of each pool process; read it before the
+    # pool shuts down
+    pool = ocr_service.ocr_pool
+    peaks = []
+    for pid in (pool._processes if pool else {}):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        peaks.append(round(int(line.split()[1]) / 1024, 1))
+        except OSError:
+            pass
+    return peaks
+
+
+async def run(
+    images: list[tuple[bytes, dict]], concurrency: int, profile: str
+) -> tuple[list[float], list[dict], int, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+    scores: list[dict] = []
+    mocks = 0
+
+    async def scan(image_data: bytes, truth: dict):
+        nonlocal mocks
+        async with semaphore:
+            start = time.perf_counter()
+            parsed = await ocr_service.parse_receipt_image(
+                image_data, use_cache=False, profile=profile
+            )
+            timings.append(time.perf_counter() - start)
+        if parsed.mock:
+            # Nothing was read from the image; do not score the made-up items
+            mocks += 1
+            scores.append(score_receipt({"items": [], "total": 0}, truth))
+        else:
+            scores.append(score_receipt(parsed.model_dump(), truth))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(scan(image_data, truth) for image_data, truth in images))
+    return timings, scores, mocks, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="directory of images with <name>.json ground truth")
+    parser.add_argument("--count", type=int, default=50, help="synthetic receipts to generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--profile", choices=sorted(ocr_service.OCR_PROFILES))
+    parser.add_argument("--backend", choices=BACKENDS)
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if not ocr_service.ocr_available:
+        sys.exit("PaddleOCR is not installed; results would be mock data")
+    if args.backend:
+        # Spawned workers read their settings from the environment
+        os.environ["OCR_BACKEND"] = args.backend
+        ocr_service.settings.ocr_backend = args.backend
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus
+        if corpus_dir is None:
+            corpus_dir = tmp
+            generate(corpus_dir, args.count, args.seed)
+        images = []
+        for path, truth in load_corpus(corpus_dir):
+            with open(path, "rb") as f:
+                images.append((f.read(), truth))
+    if not images:
+        sys.exit("No images with ground truth found in the corpus")
+
+    # Start the workers and load the model in each before timing anything
+    profile = ocr_service.resolve_profile(args.profile)
+    await ocr_service.warmup_ocr([profile])
+
+    timings, scores, mocks, elapsed = await run(images, args.concurrency, profile)
+    worker_peaks = worker_peak_rss_mb()
+    ocr_service.shutdown_ocr_pool()
+
+    settings = ocr_service.settings
+    results = {
+        "receipts": len(images),
+        "concurrency": args.concurrency,
+        "profile": profile,
+        "backend": settings.ocr_backend,
+        "settings": {
+            "ocr_workers": settings.ocr_workers,
+            "ocr_fallback_queue_depth": settings.ocr_fallback_queue_depth,
+            "ocr_worker_threads": settings.ocr_worker_threads,
+            "ocr_onnx_threads": settings.ocr_onnx_threads,
+            "ocr_batch_size": settings.ocr_batch_size,
+            "ocr_batch_wait_ms": settings.ocr_batch_wait_ms,
+            "ocr_max_side": settings.ocr_max_side,
+            "ocr_crop_receipt": settings.ocr_crop_receipt,
+            "ocr_grayscale": settings.ocr_grayscale,
+        },
+        "machine": {"cpus": os.cpu_count(), "python": platform.python_version()},
+        "p50_ms": round(statistics.median(timings) * 1000, 1),
+        "p95_ms": round(percentile(timings, 95) * 1000, 1),
+        "mean_ms": round(statistics.mean(timings) * 1000, 1),
+        "images_per_sec": round(len(images) / elapsed, 2),
+        "peak_rss_mb": {
+            "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "workers": worker_peaks,
+        },
+        "mock_results": mocks,
+        **summarize_scores(scores),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
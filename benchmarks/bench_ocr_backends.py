@@ -0,0 +1,79 @@
+"""Paddle vs ONNX Runtime OCR backends, side by side on the same corpus.
+
+    python benchmarks/bench_ocr_backends.py [--corpus path/to/corpus] \
+        [--backends paddle,onnx] [--onnx-threads 1,2,4] [--profile fast]
+
+Runs bench_ocr.py once per backend (and per ONNX thread count) in a fresh
+process, so model load and peak memory are not shared between runs. The
+ONNX models have to be exported to OCR_ONNX_MODEL_DIR first (see README).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.synthetic_receipts import generate  # noqa: E402
+
+BENCH_OCR = os.path.join(os.path.dirname(__file__), "bench_ocr.py")
+COLUMNS = [
+    "p50_ms", "p95_ms", "images_per_sec", "peak_rss_mb",
+    "item_f1", "total_accuracy", "mock_results",
+]
+
+
+def run(corpus: str, backend: str, env: dict, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        command = [
+            sys.executable, BENCH_OCR,
+            "--corpus", corpus,
+            "--backend", backend,
+            "--concurrency", str(args.concurrency),
+            "--output", output.name,
+        ]
+        if args.profile:
+            command += ["--profile", args.profile]
+        subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL)
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--backends", default="paddle,onnx")
+    parser.add_argument("--onnx-threads", default="", help="comma-separated OCR_ONNX_THREADS values")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--profile")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = tmp
+            generate(corpus, args.count)
+
+        rows = []
+        for backend in args.backends.split(","):
+            threads = [t for t in args.onnx_threads.split(",") if t] if backend == "onnx" else []
+            for thread_count in threads or [None]:
+                env = dict(os.environ)
+                if thread_count:
+                    env["OCR_ONNX_THREADS"] = thread_count
+                result = run(corpus, backend, env, args)
+                rows.append({
+                    "backend": backend,
+                    "onnx_threads": int(thread_count) if thread_count else None,
+                    **{column: result.get(column) for column in COLUMNS},
+                })
+                print(json.dumps(rows[-1]), file=sys.stderr)
+
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
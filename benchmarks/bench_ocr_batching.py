@@ -0,0 +1,93 @@
+"""OCR throughput (images/sec) for different micro-batching settings.
+
+    python benchmarks/bench_ocr_batching.py receipts/*.jpg --requests 64 \
+        --batch-sizes 1,2,4,8 --waits 0,10,25 --concurrency 2,4,64 [--stand-in-ms 300]
+
+Every configuration sends --requests scans through the same worker pool,
+with at most --concurrency in flight at once, so only the batching stage
+changes between runs. --stand-in-ms replaces OCR with a worker that sleeps
+that long per image, for a box without the models.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import ocr_service  # noqa: E402
+
+
+def stand_in_batch(images: list[bytes], options, profile=None) -> list[list[str]]:
+    # Runs in the pool workers, which inherit the environment
+    time.sleep(float(os.environ["BENCH_STAND_IN_MS"]) * len(images) / 1000)
+    return [["stand-in"] for _ in images]
+
+
+async def run(
+    images: list[bytes], requests: int, batch_size: int, wait_ms: float, concurrency: int
+) -> dict:
+    batcher = ocr_service.OcrBatcher(batch_size, wait_ms)
+    payloads = list(itertools.islice(itertools.cycle(images), requests))
+    slots = asyncio.Semaphore(concurrency)
+
+    async def scan(image: bytes):
+        async with slots:
+            await batcher.submit(image)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(scan(image) for image in payloads))
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    return {
+        "batch_size": batch_size,
+        "wait_ms": wait_ms,
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(requests / elapsed, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--waits", default="0,10,25")
+    parser.add_argument("--concurrency", default="64")
+    parser.add_argument("--stand-in-ms", type=float)
+    args = parser.parse_args()
+
+    if args.stand_in_ms is not None:
+        os.environ["BENCH_STAND_IN_MS"] = str(args.stand_in_ms)
+        ocr_service._extract_text_batch = stand_in_batch
+
+    images = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            images.append(f.read())
+
+    # Load the model in every worker before timing anything
+    workers = ocr_service.settings.ocr_workers
+    await run(images, workers, 1, 0, workers)
+
+    results = []
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+            for wait_ms in [float(w) for w in args.waits.split(",")]:
+                results.append(
+                    await run(images, args.requests, batch_size, wait_ms, concurrency)
+                )
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+    ocr_service.shutdown_ocr_pool()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""Per-request latency and peak RSS of the image decode path.
+
+    python benchmarks/bench_ocr_decode.py receipt.jpg --iterations 50 [--ocr]
+
+"tempfile" is the previous path: split the data URL, base64-decode, write a
+NamedTemporaryFile and let OpenCV read it back. "memory" is the current
+decode_image_base64 + in-memory decode path (no resizing or cropping). Each mode runs in its own process
+so ru_maxrss is not shared between them.
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import ocr_service  # noqa: E402
+from services.image_preprocess import PreprocessOptions, preprocess_image  # noqa: E402
+
+
+def decode_tempfile(image_base64: str):
+    import cv2
+
+    if "," in image_base64:
+        image_base64 = image_base64.split(",")[1]
+    image_data = base64.b64decode(image_base64)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
+        tmp_file.write(image_data)
+        tmp_path = tmp_file.name
+    try:
+        return cv2.imread(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+
+
+def decode_memory(image_base64: str):
+    return preprocess_image(
+        ocr_service.decode_image_base64(image_base64), PreprocessOptions()
+    )
+
+
+def run_mode(mode: str, path: str, iterations: int, ocr: bool) -> dict:
+    with open(path, "rb") as f:
+        payload = "data:image/jpeg;base64," + base64.b64encode(f.read()).decode()
+
+    decode = decode_tempfile if mode == "tempfile" else decode_memory
+    engine = None
+    if ocr:
+        engine = ocr_service.get_ocr()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        image = decode(payload)
+        if engine:
+            engine.read(image)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "mode": mode,
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--ocr", action="store_true", help="also run PaddleOCR on the decoded image")
+    parser.add_argument("--mode", choices=["tempfile", "memory"])
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.image, args.iterations, args.ocr)))
+        return
+
+    results = []
+    for mode in ["tempfile", "memory"]:
+        command = [sys.executable, __file__, args.image, "--mode", mode,
+                   "--iterations", str(args.iterations)]
+        if args.ocr:
+            command.append("--ocr")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Latency of /api/groups while /api/receipts/parse is under load.
+
+Run against a live server:
+
+    python benchmarks/bench_ocr_load.py --token <jwt> --image receipt.jpg
+
+Run it once against a build that does OCR inline on the event loop for a
+baseline; the groups p99 shows how long other requests were being stalled.
+Parse requests turned away with 429 (OCR_MAX_QUEUE / OCR_MAX_PER_USER) are
+counted separately and retried after a short pause.
+"""
+import argparse
+import base64
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def request(url: str, token: str, body: bytes | None = None) -> tuple[int, float]:
+    req = urllib.request.Request(url, data=body, method="POST" if body else "GET")
+    req.add_header("Authorization", f"Bearer {token}")
+    if body:
+        req.add_header("Content-Type", "application/json")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            code = resp.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    return code, time.perf_counter() - start
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--parse-concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        body = json.dumps(
+            {"imageBase64": base64.b64encode(f.read()).decode()}
+        ).encode()
+
+    stop = threading.Event()
+    parse_latencies: list[float] = []
+    reject_latencies: list[float] = []
+    probe_latencies: list[float] = []
+
+    def parse_loop():
+        while not stop.is_set():
+            code, latency = request(f"{args.base_url}/api/receipts/parse", args.token, body)
+            if code == 429:
+                reject_latencies.append(latency)
+                time.sleep(0.5)
+            else:
+                parse_latencies.append(latency)
+
+    def probe_loop():
+        while not stop.is_set():
+            probe_latencies.append(request(f"{args.base_url}/api/groups", args.token)[1])
+            time.sleep(args.probe_interval)
+
+    threads = [threading.Thread(target=parse_loop) for _ in range(args.parse_concurrency)]
+    threads.append(threading.Thread(target=probe_loop))
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(json.dumps(
+        {
+            "parse_requests": len(parse_latencies),
+            "parse_per_sec": len(parse_latencies) / args.duration,
+            "parse_p99_ms": percentile(parse_latencies, 99) * 1000 if parse_latencies else None,
+            "parse_rejected": len(reject_latencies),
+            "reject_max_ms": max(reject_latencies) * 1000 if reject_latencies else None,
+            "groups_requests": len(probe_latencies),
+            "groups_p50_ms": statistics.median(probe_latencies) * 1000,
+            "groups_p99_ms": percentile(probe_latencies, 99) * 1000,
+            "groups_max_ms": max(probe_latencies) * 1000,
+        },
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    main()
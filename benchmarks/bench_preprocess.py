@@ -0,0 +1,79 @@
+"""Latency and item-extraction accuracy with and without each preprocessing step.
+
+    python benchmarks/bench_preprocess.py path/to/corpus [--max-side 1600]
+
+The corpus is a directory of receipt photos, each with a <name>.json ground
+truth file (see receipt_accuracy.load_corpus). OCR runs in-process on one
+model instance so only the preprocessing options differ between rows.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.receipt_accuracy import load_corpus, score_receipt, summarize_scores  # noqa: E402
+from services import ocr_service  # noqa: E402
+from services.image_preprocess import PreprocessOptions  # noqa: E402
+
+
+def configurations(max_side: int) -> dict[str, PreprocessOptions]:
+    none = PreprocessOptions(exif_rotate=False)
+    return {
+        "none": none,
+        "exif_rotate": none.model_copy(update={"exif_rotate": True}),
+        "downscale": none.model_copy(update={"max_side": max_side}),
+        "crop_receipt": none.model_copy(update={"crop_receipt": True}),
+        "grayscale": none.model_copy(update={"grayscale": True}),
+        "all": PreprocessOptions(
+            exif_rotate=True, max_side=max_side, crop_receipt=True, grayscale=True
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--max-side", type=int, default=1600)
+    args = parser.parse_args()
+
+    if not ocr_service.ocr_available:
+        sys.exit("PaddleOCR is not installed; accuracy numbers would be mock data")
+
+    corpus = load_corpus(args.corpus)
+    images = []
+    for path, truth in corpus:
+        with open(path, "rb") as f:
+            images.append((f.read(), truth))
+
+    # Load the model before timing
+    ocr_service._extract_text_batch([images[0][0]], PreprocessOptions())
+
+    results = []
+    for name, options in configurations(args.max_side).items():
+        timings = []
+        scores = []
+        for image_data, truth in images:
+            start = time.perf_counter()
+            lines = ocr_service._extract_text_batch([image_data], options)[0]
+            timings.append(time.perf_counter() - start)
+            parsed = ocr_service.parse_receipt_text(lines)
+            scores.append(score_receipt(parsed.model_dump(), truth))
+
+        results.append({
+            "config": name,
+            "receipts": len(images),
+            "mean_ms": round(statistics.mean(timings) * 1000, 1),
+            "p50_ms": round(statistics.median(timings) * 1000, 1),
+            **summarize_scores(scores),
+        })
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Push throughput: the blocking Expo SDK vs the pooled async client.
+
+    python benchmarks/bench_push_client.py --messages 2000 --delay-ms 150 \
+        --concurrency 1,4,8 [--fail-rate 0.05]
+
+Both send --messages messages to the local Expo stand-in in
+fake_push_server.py, which sleeps --delay-ms per request. The SDK sends its
+100-message chunks one after another; the async client sends them
+--concurrency at a time and then fetches the delivery receipts for every
+ticket. Reports messages/sec, requests and TCP connections.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from exponent_server_sdk import PushClient, PushMessage  # noqa: E402
+
+from benchmarks.fake_push_server import FakePushHandler, start_fake_push_server  # noqa: E402
+from services.push_client import ExpoPushClient  # noqa: E402
+
+
+def reset_counters():
+    FakePushHandler.requests = 0
+    FakePushHandler.connections = set()
+
+
+def messages(count: int) -> list[dict]:
+    return [
+        {"to": f"ExponentPushToken[device-{i}]", "title": "Chi tiêu mới 💸", "body": "bench"}
+        for i in range(count)
+    ]
+
+
+async def measure_sdk(url: str, count: int) -> dict:
+    reset_counters()
+    client = PushClient(host=url)
+    start = time.perf_counter()
+    tickets = await asyncio.to_thread(
+        client.publish_multiple, [PushMessage(**message) for message in messages(count)]
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "client": "sdk",
+        "sent": sum(1 for ticket in tickets if ticket.is_success()),
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(count / elapsed, 1),
+        "requests": FakePushHandler.requests,
+        "connections": len(FakePushHandler.connections),
+    }
+
+
+async def measure_async(url: str, count: int, concurrency: int) -> dict:
+    reset_counters()
+    client = ExpoPushClient(url, max_concurrency=concurrency, retry_backoff=0.05)
+    start = time.perf_counter()
+    tickets = await client.send(messages(count))
+    elapsed = time.perf_counter() - start
+
+    ticket_ids = [ticket.id for ticket in tickets if ticket.is_success()]
+    receipts_start = time.perf_counter()
+    receipts = await client.get_receipts(ticket_ids)
+    receipts_elapsed = time.perf_counter() - receipts_start
+    await client.close()
+    return {
+        "client": f"async x{concurrency}",
+        "sent": len(ticket_ids),
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(count / elapsed, 1),
+        "receipts": sum(1 for receipt in receipts.values() if receipt.is_success()),
+        "receipts_seconds": round(receipts_elapsed, 3),
+        "requests": FakePushHandler.requests,
+        "connections": len(FakePushHandler.connections),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=150)
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_push_server(args.delay_ms, args.fail_rate)
+    results = []
+    try:
+        results.append(await measure_sdk(url, args.messages))
+    except Exception as e:
+        # The SDK does not retry; one failed chunk loses the whole send
+        results.append({"client": "sdk", "error": str(e)})
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        results.append(await measure_async(url, args.messages, concurrency))
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Latency and upload count when a user sends the same receipt photo again.
+
+    python benchmarks/bench_receipt_dedup.py receipt.jpg --user-id <id> \
+        --repeats 10 --upload-delay-ms 800 [--ocr-delay-ms 1200]
+
+Needs DATABASE_URL and an existing user. Uploads go to a LocalImageStore in
+a temp directory that sleeps --upload-delay-ms per call, so the number of
+files left there is the number of uploads made. The image gets a random
+suffix first, so the first call is always a new receipt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import connect_db, db, disconnect_db  # noqa: E402
+from services import ocr_service, receipt_service, storage_service  # noqa: E402
+from services.receipt_parser import ParsedReceipt, ReceiptItem  # noqa: E402
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--upload-delay-ms", type=float, default=800)
+    parser.add_argument("--ocr-delay-ms", type=float)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        # Trailing bytes after the JPEG end marker are ignored by decoders
+        image_data = f.read() + os.urandom(16)
+
+    # Upload inline so every upload made is counted before the script exits
+    receipt_service.settings.receipt_upload_mode = "inline"
+    store_dir = tempfile.mkdtemp(prefix="receipts-")
+    storage_service.image_store = storage_service.LocalImageStore(
+        store_dir, args.upload_delay_ms
+    )
+
+    if args.ocr_delay_ms is not None:
+        async def stand_in_ocr(image_data: bytes, image_hash=None, use_cache=True, profile=None):
+            await asyncio.sleep(args.ocr_delay_ms / 1000)
+            return ParsedReceipt(items=[ReceiptItem(name="Trà đá", price=5000, quantity=1)], total=5000)
+
+        receipt_service.parse_receipt_image = stand_in_ocr
+    elif ocr_service.ocr_available:
+        await ocr_service.warmup_ocr()
+    else:
+        sys.exit("PaddleOCR is not installed; pass --ocr-delay-ms to simulate it")
+
+    await connect_db()
+    timings = []
+    receipt_ids = set()
+    for _ in range(args.repeats + 1):
+        start = time.perf_counter()
+        response = await receipt_service.process_receipt(image_data, args.user_id)
+        timings.append(time.perf_counter() - start)
+        receipt_ids.add(response.receiptId)
+
+    await db.receipt.delete_many(where={"id": {"in": list(receipt_ids)}})
+    await disconnect_db()
+    ocr_service.shutdown_ocr_pool()
+
+    print(json.dumps(
+        {
+            "first_ms": round(timings[0] * 1000, 1),
+            "repeat_p50_ms": round(statistics.median(timings[1:]) * 1000, 1),
+            "requests": len(timings),
+            "uploads": len(os.listdir(store_dir)),
+            "receipt_rows": len(receipt_ids),
+        },
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
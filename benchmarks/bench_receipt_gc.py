@@ -0,0 +1,123 @@
+"""Throughput of deleting orphaned receipts and their images.
+
+    python benchmarks/bench_receipt_gc.py --receipts 300 --delay-ms 100
+    python benchmarks/bench_receipt_gc.py --receipts 300 --user-id <id>
+
+Without --user-id it only times the image deletes: three images per receipt
+deleted one destroy call at a time (what a per-receipt cleanup would do) vs
+batched Admin API calls, both against the local Cloudinary stand-in from
+bench_image_store.py that sleeps --delay-ms per request.
+
+With --user-id it also needs DATABASE_URL: it creates that many receipts
+older than the grace period with images in a temporary LocalImageStore, runs
+the collector in dry-run and then for real (rate limit off), and reports
+both runs and how many images are left over.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_image_store import FakeCloudinary  # noqa: E402
+from database import connect_db, db, disconnect_db  # noqa: E402
+from services import receipt_gc, storage_service  # noqa: E402
+from services.cloudinary_service import MAX_DELETE_BATCH, CloudinaryClient  # noqa: E402
+
+
+async def measure_deletes(receipts: int, delay_ms: float) -> list[dict]:
+    FakeCloudinary.delay = delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCloudinary)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = CloudinaryClient(
+        f"http://127.0.0.1:{server.server_port}/v1_1", "bench", "key", "secret"
+    )
+    public_ids = [f"chiatien/receipts/{i}" for i in range(receipts * 3)]
+
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client.destroy(public_id) for public_id in public_ids))
+    elapsed = time.perf_counter() - start
+    results.append({
+        "method": "destroy_each",
+        "calls": len(public_ids),
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(public_ids) / elapsed, 1),
+    })
+
+    start = time.perf_counter()
+    deleted = 0
+    for i in range(0, len(public_ids), MAX_DELETE_BATCH):
+        deleted += await client.delete_resources(public_ids[i : i + MAX_DELETE_BATCH])
+    elapsed = time.perf_counter() - start
+    results.append({
+        "method": "delete_resources",
+        "calls": -(-len(public_ids) // MAX_DELETE_BATCH),
+        "deleted": deleted,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(public_ids) / elapsed, 1),
+    })
+
+    await client.close()
+    server.shutdown()
+    return results
+
+
+async def measure_collector(receipts: int, user_id: str) -> dict:
+    store_dir = tempfile.mkdtemp(prefix="receipts-")
+    store = storage_service.LocalImageStore(store_dir)
+    storage_service.image_store = store
+    receipt_gc.settings.receipt_gc_max_calls_per_minute = 0
+
+    created_at = datetime.now(timezone.utc) - timedelta(
+        hours=receipt_gc.settings.receipt_gc_grace_hours + 1
+    )
+    await connect_db()
+    for _ in range(receipts):
+        original, display, thumbnail = [await store.upload(b"\xff\xd8\xff\xd9") for _ in range(3)]
+        await db.receipt.create(
+            data={
+                "uploadedById": user_id,
+                "createdAt": created_at,
+                "updatedAt": created_at,
+                "imageUrl": original.url,
+                "publicId": original.public_id,
+                "displayUrl": display.url,
+                "displayPublicId": display.public_id,
+                "thumbnailUrl": thumbnail.url,
+                "thumbnailPublicId": thumbnail.public_id,
+            }
+        )
+
+    dry_run = await receipt_gc.collect_orphan_receipts(dry_run=True)
+    collected = await receipt_gc.collect_orphan_receipts()
+    await disconnect_db()
+    return {
+        "dry_run": dry_run.model_dump(),
+        "collect": collected.model_dump(),
+        "images_left": len(os.listdir(store_dir)),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--receipts", type=int, default=300)
+    parser.add_argument("--delay-ms", type=float, default=100)
+    parser.add_argument("--user-id")
+    args = parser.parse_args()
+
+    results = {"image_deletes": await measure_deletes(args.receipts, args.delay_ms)}
+    if args.user_id:
+        results["collector"] = await measure_collector(args.receipts, args.user_id)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
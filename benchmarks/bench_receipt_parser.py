@@ -0,0 +1,65 @@
+"""Check parse_receipt_text against the OCR line corpus and measure lines/sec.
+
+    python benchmarks/bench_receipt_parser.py [--seconds 3]
+
+benchmarks/corpus/ocr_lines holds raw OCR line dumps (<name>.txt) and the
+parser output they must produce (<name>.expected.json). Exits non-zero on
+any difference, so it doubles as a regression check for parser edits.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.receipt_parser import parse_receipt_text  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus", "ocr_lines")
+
+
+def load_corpus() -> list[tuple[str, list[str], dict]]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        with open(path[:-4] + ".expected.json", encoding="utf-8") as f:
+            expected = json.load(f)
+        corpus.append((os.path.basename(path), lines, expected))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = 0
+    for name, lines, expected in corpus:
+        actual = parse_receipt_text(lines).model_dump(exclude={"mock", "profile"})
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH {name}:\n  expected {expected}\n  actual   {actual}")
+
+    total_lines = sum(len(lines) for _, lines, _ in corpus)
+    parsed_lines = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        for _, lines, _ in corpus:
+            parse_receipt_text(lines)
+        parsed_lines += total_lines
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "receipts": len(corpus),
+        "mismatches": failures,
+        "lines_per_sec": round(parsed_lines / elapsed),
+    }, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""End-to-end latency of the upload + OCR stage: sequential, concurrent, and
+write-behind (OCR, then the image is only staged on local disk).
+
+    python benchmarks/bench_receipt_pipeline.py receipt.jpg --upload-delay-ms 800
+
+Uploads go to a LocalImageStore that sleeps --upload-delay-ms to stand in for
+the Cloudinary round trip. OCR runs through the real worker pool when
+PaddleOCR is installed; pass --ocr-delay-ms to stand in for it as well on a
+box without the models.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import ocr_service, receipt_service, staged_uploads, storage_service  # noqa: E402
+from services.receipt_cache import hash_image  # noqa: E402
+from services.receipt_parser import ParsedReceipt  # noqa: E402
+
+
+async def sequential(image_data: bytes, image_hash: str):
+    store = storage_service.get_image_store()
+    upload_result = await store.upload(image_data)
+    parsed_data = await receipt_service.parse_receipt_image(image_data, image_hash)
+    return upload_result, parsed_data
+
+
+async def write_behind(image_data: bytes, image_hash: str):
+    _, parsed_data = await receipt_service.run_receipt_pipeline(
+        image_data, image_hash, upload=False
+    )
+    # No upload workers run here, so this measures only what the request waits for
+    await staged_uploads.get_staged_uploads().stage(image_hash, image_data)
+    return None, parsed_data
+
+
+async def time_runs(pipeline, image_data: bytes, runs: int) -> dict:
+    timings = []
+    for run in range(runs):
+        # A different hash every run so the receipt cache never answers
+        image_hash = f"{hash_image(image_data)}-{pipeline.__name__}-{run}"
+        start = time.perf_counter()
+        await pipeline(image_data, image_hash)
+        timings.append(time.perf_counter() - start)
+    return {
+        "pipeline": pipeline.__name__,
+        "runs": runs,
+        "mean_ms": round(statistics.mean(timings) * 1000, 1),
+        "p50_ms": round(statistics.median(timings) * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--upload-delay-ms", type=float, default=800)
+    parser.add_argument("--ocr-delay-ms", type=float)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_data = f.read()
+
+    storage_service.image_store = storage_service.LocalImageStore(
+        tempfile.mkdtemp(prefix="receipts-"), args.upload_delay_ms
+    )
+    staged_uploads.staged_uploads = staged_uploads.StagedUploads(
+        tempfile.mkdtemp(prefix="staging-"), max_attempts=1, retry_delay=0
+    )
+
+    if args.ocr_delay_ms is not None:
+        async def stand_in_ocr(image_data: bytes, image_hash=None, use_cache=True, profile=None):
+            await asyncio.sleep(args.ocr_delay_ms / 1000)
+            return ParsedReceipt(items=[], total=0)
+
+        receipt_service.parse_receipt_image = stand_in_ocr
+    elif ocr_service.ocr_available:
+        await ocr_service.warmup_ocr()
+    else:
+        sys.exit("PaddleOCR is not installed; pass --ocr-delay-ms to simulate it")
+
+    results = [
+        await time_runs(sequential, image_data, args.runs),
+        await time_runs(receipt_service.run_receipt_pipeline, image_data, args.runs),
+        await time_runs(write_behind, image_data, args.runs),
+    ]
+    ocr_service.shutdown_ocr_pool()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Bytes stored and downloaded per receipt with display/thumbnail renditions.
+
+    python benchmarks/bench_receipt_renditions.py receipt.jpg [more.jpg ...] \
+        [--list-size 20]
+
+For each photo it reports the original, display and thumbnail sizes and how
+long make_renditions took. --list-size estimates the image bytes a client
+downloads to render a group's expense list with that many receipts, loading
+the originals (what it did before) or the thumbnails.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.image_renditions import get_rendition_options, make_renditions  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--list-size", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    options = get_rendition_options()
+    rows = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            image_data = f.read()
+
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            renditions = make_renditions(image_data, options)
+            timings.append(time.perf_counter() - start)
+
+        rows.append({
+            "image": os.path.basename(path),
+            "original_kb": round(len(image_data) / 1024, 1),
+            "display_kb": round(len(renditions["display"]) / 1024, 1),
+            "thumbnail_kb": round(len(renditions["thumbnail"]) / 1024, 1),
+            "stored_ratio": round(
+                (len(image_data) + len(renditions["display"]) + len(renditions["thumbnail"]))
+                / len(image_data),
+                2,
+            ),
+            "generate_ms": round(statistics.median(timings) * 1000, 1),
+        })
+
+    mean_original = statistics.mean(row["original_kb"] for row in rows)
+    mean_thumbnail = statistics.mean(row["thumbnail_kb"] for row in rows)
+    print(json.dumps(
+        {
+            "images": rows,
+            "list_payload_kb": {
+                "receipts": args.list_size,
+                "originals": round(mean_original * args.list_size, 1),
+                "thumbnails": round(mean_thumbnail * args.list_size, 1),
+            },
+        },
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""API worker startup time and per-OCR-worker memory.
+
+    python benchmarks/bench_startup.py import --runs 5
+    python benchmarks/bench_startup.py pool
+
+"import" times `import main` in fresh interpreters (what every uvicorn worker
+pays before serving). "pool" starts the OCR pool with warmup in three setups
+(spawn, fork, fork + preload) and reads Rss/Pss of every worker process
+from /proc: Pss drops when pages are shared copy-on-write.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+POOL_SCRIPT = """
+import asyncio, json, os
+from services import ocr_service
+
+if ocr_service.settings.ocr_preload:
+    ocr_service.preload_ocr()
+asyncio.run(ocr_service.warmup_ocr())
+
+def memory(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower() + "_mb"] = round(int(rest.split()[0]) / 1024, 1)
+    return values
+
+workers = [memory(pid) for pid in ocr_service.get_ocr_pool()._processes]
+print(json.dumps({"parent": memory(os.getpid()), "workers": workers}))
+ocr_service.shutdown_ocr_pool()
+"""
+
+
+def time_import(runs: int) -> dict:
+    timings = []
+    rss = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import resource, main; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        timings.append(time.perf_counter() - start)
+        rss.append(int(output.strip().splitlines()[-1]) / 1024)
+    return {
+        "runs": runs,
+        "import_main_s": round(statistics.median(timings), 3),
+        "peak_rss_mb": round(statistics.median(rss), 1),
+    }
+
+
+def measure_pool() -> list[dict]:
+    results = []
+    for start_method, preload in (("spawn", False), ("fork", False), ("fork", True)):
+        env = dict(os.environ, OCR_START_METHOD=start_method, OCR_PRELOAD=str(preload).lower())
+        output = subprocess.run(
+            [sys.executable, "-c", POOL_SCRIPT],
+            cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results.append({
+            "start_method": start_method,
+            "preload": preload,
+            **json.loads(output.strip().splitlines()[-1]),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mode", choices=["import", "pool"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.mode == "import":
+        print(json.dumps(time_import(args.runs), indent=2))
+    else:
+        print(json.dumps(measure_pool(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Unread-count latency: COUNT over Notification vs the UnreadCounter row.
+
+    python benchmarks/bench_unread_count.py --notifications 100000 \
+        --unread-ratio 0.3 --repeats 200 [--concurrent-writes 200]
+
+Needs DATABASE_URL. It creates a temporary user with --notifications
+notifications, then times the old COUNT query, a read of the counter row and
+a read through the in-process cache (p50/p95 ms). It then runs
+--concurrent-writes creates and mark-as-read calls at once and checks that
+the counter still equals COUNT, and times one reconciliation pass. The user
+and everything attached to it is deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_ocr_load import percentile  # noqa: E402
+from database import connect_db, db, disconnect_db  # noqa: E402
+from services import unread_counter  # noqa: E402
+
+
+async def timed(fn, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=100_000)
+    parser.add_argument("--unread-ratio", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--concurrent-writes", type=int, default=200)
+    args = parser.parse_args()
+
+    await connect_db()
+    user = await db.user.create(
+        data={"username": f"bench-{uuid.uuid4().hex[:12]}", "password": "-", "displayName": "Bench"}
+    )
+    try:
+        for start in range(0, args.notifications, 5000):
+            await db.notification.create_many(
+                data=[
+                    {
+                        "userId": user.id,
+                        "type": "bench",
+                        "title": "Bench",
+                        "body": f"Notification {i}",
+                        "read": random.random() >= args.unread_ratio,
+                    }
+                    for i in range(start, min(start + 5000, args.notifications))
+                ]
+            )
+        # The first read creates the counter row from a full count
+        await unread_counter.get_unread_count(user.id)
+
+        async def count_query():
+            await db.notification.count(where={"userId": user.id, "read": False})
+
+        async def counter_row():
+            await db.unreadcounter.find_unique(where={"userId": user.id})
+
+        async def cached():
+            await unread_counter.get_unread_count(user.id)
+
+        results = {
+            "notifications": args.notifications,
+            "count_query": await timed(count_query, args.repeats),
+            "counter_row": await timed(counter_row, args.repeats),
+            "cached": await timed(cached, args.repeats),
+        }
+
+        unread = await db.notification.find_many(
+            where={"userId": user.id, "read": False}, take=args.concurrent_writes
+        )
+        writes = [
+            unread_counter.create_notification(
+                {"userId": user.id, "type": "bench", "title": "Bench", "body": "concurrent"}
+            )
+            for _ in range(args.concurrent_writes)
+        ]
+        # Every notification is marked twice so double reads are covered
+        writes += [unread_counter.mark_read(user.id, n.id) for n in unread for _ in range(2)]
+        random.shuffle(writes)
+        await asyncio.gather(*writes)
+
+        counter = await db.unreadcounter.find_unique(where={"userId": user.id})
+        actual = await db.notification.count(where={"userId": user.id, "read": False})
+        results["after_concurrent_writes"] = {"counter": counter.count, "count": actual}
+
+        start = time.perf_counter()
+        await unread_counter.reconcile_unread_counters()
+        results["reconcile_seconds"] = round(time.perf_counter() - start, 3)
+    finally:
+        await db.user.delete(where={"id": user.id})
+        await disconnect_db()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Request size and server-side peak memory: base64 JSON vs multipart upload.
+
+    python benchmarks/bench_upload_formats.py receipt.jpg
+
+Both endpoints below do what /api/receipts/parse and /parse-upload do up to
+the point where the image bytes are handed to process_receipt, and are
+driven in-process through the ASGI test client. Peak memory is the
+tracemalloc peak for one request, which covers body buffering, JSON/multipart
+parsing and base64 decoding (plus the test client's own copy of the body,
+the same for both formats).
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tracemalloc
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models.schemas import ReceiptParseRequest  # noqa: E402
+from services.ocr_service import decode_image_base64  # noqa: E402
+
+app = FastAPI()
+
+
+@app.post("/json")
+async def parse_json(request: ReceiptParseRequest):
+    return {"bytes": len(decode_image_base64(request.imageBase64))}
+
+
+@app.post("/multipart")
+async def parse_multipart(file: UploadFile = File(...)):
+    return {"bytes": len(await file.read())}
+
+
+def measure(client: TestClient, **kwargs) -> tuple[int, dict]:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    response = client.post(**kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.raise_for_status()
+    return peak, response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_data = f.read()
+
+    json_body = json.dumps(
+        {"imageBase64": "data:image/jpeg;base64," + base64.b64encode(image_data).decode()}
+    ).encode()
+
+    client = TestClient(app)
+    multipart_request = client.build_request(
+        "POST", "/multipart", files={"file": ("receipt.jpg", image_data, "image/jpeg")}
+    )
+    multipart_size = len(multipart_request.read())
+
+    # First calls warm up imports and the client
+    measure(client, url="/json", content=json_body, headers={"Content-Type": "application/json"})
+    measure(client, url="/multipart", files={"file": ("receipt.jpg", image_data, "image/jpeg")})
+
+    json_peak, _ = measure(
+        client, url="/json", content=json_body, headers={"Content-Type": "application/json"}
+    )
+    multipart_peak, _ = measure(
+        client, url="/multipart", files={"file": ("receipt.jpg", image_data, "image/jpeg")}
+    )
+
+    mb = 1024 * 1024
+    print(json.dumps({
+        "image_mb": round(len(image_data) / mb, 2),
+        "json": {
+            "request_mb": round(len(json_body) / mb, 2),
+            "peak_mb": round(json_peak / mb, 2),
+        },
+        "multipart": {
+            "request_mb": round(multipart_size / mb, 2),
+            "peak_mb": round(multipart_peak / mb, 2),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Local stand-in for the Expo push API.
+
+    python benchmarks/fake_push_server.py --port 8081 --delay-ms 150 [--fail-rate 0.05]
+
+Then point the API at it with EXPO_PUSH_HOST=http://127.0.0.1:8081. It
+answers /--/api/v2/push/send with one "ok" ticket per message, except
+DeviceNotRegistered for tokens containing "Unregistered", rejects requests of
+more than 100 messages like Expo does, and fails --fail-rate of requests with
+503. /--/api/v2/push/getReceipts answers "ok" for every id it issued.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_MESSAGES = 100
+
+
+class FakePushHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    fail_rate = 0.0
+    requests = 0
+    messages = 0
+    connections: set = set()
+    tickets: set = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or "null")
+        with self.lock:
+            FakePushHandler.requests += 1
+            self.connections.add(self.client_address)
+        time.sleep(self.delay)
+
+        if random.random() < self.fail_rate:
+            self._reply(503, {"errors": [{"code": "INTERNAL_SERVER_ERROR", "message": "fake outage"}]})
+        elif self.path.startswith("/--/api/v2/push/send"):
+            self._send(payload if isinstance(payload, list) else [payload])
+        elif self.path.startswith("/--/api/v2/push/getReceipts"):
+            ids = payload.get("ids", [])
+            self._reply(200, {"data": {i: {"status": "ok"} for i in ids if i in self.tickets}})
+        else:
+            self._reply(404, {"errors": [{"code": "NOT_FOUND", "message": self.path}]})
+
+    def _send(self, messages: list[dict]):
+        if len(messages) > MAX_MESSAGES:
+            self._reply(400, {
+                "errors": [{
+                    "code": "PUSH_TOO_MANY_NOTIFICATIONS",
+                    "message": f"You are trying to send more than {MAX_MESSAGES} push notifications in one request",
+                }]
+            })
+            return
+
+        data = []
+        for message in messages:
+            if "Unregistered" in message.get("to", ""):
+                data.append({
+                    "status": "error",
+                    "message": f"{message['to']} is not a registered push notification recipient",
+                    "details": {"error": "DeviceNotRegistered"},
+                })
+            else:
+                ticket = str(uuid.uuid4())
+                self.tickets.add(ticket)
+                data.append({"status": "ok", "id": ticket})
+        with self.lock:
+            FakePushHandler.messages += len(messages)
+        self._reply(200, {"data": data})
+
+    def _reply(self, status: int, body: dict):
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_push_server(
+    delay_ms: float = 0, fail_rate: float = 0.0, port: int = 0
+) -> tuple[ThreadingHTTPServer, str]:
+    FakePushHandler.delay = delay_ms / 1000
+    FakePushHandler.fail_rate = fail_rate
+    FakePushHandler.requests = 0
+    FakePushHandler.messages = 0
+    FakePushHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakePushHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay-ms", type=float, default=150)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_push_server(args.delay_ms, args.fail_rate, args.port)
+    print(f"Fake Expo push API on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
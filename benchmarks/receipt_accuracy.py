@@ -0,0 +1,56 @@
+import json
+import os
+import unicodedata
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_corpus(directory: str) -> list[tuple[str, dict]]:
+    # Every image has a sidecar <name>.json: {"items": [{"name", "price", "quantity"}], "total"}
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        truth_path = os.path.join(directory, stem + ".json")
+        if not os.path.exists(truth_path):
+            continue
+        with open(truth_path, encoding="utf-8") as f:
+            corpus.append((os.path.join(directory, name), json.load(f)))
+    return corpus
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", name).lower().split())
+
+
+def score_receipt(parsed: dict, truth: dict) -> dict:
+    expected = {
+        (normalize_name(i["name"]), float(i["price"]), int(i["quantity"]))
+        for i in truth["items"]
+    }
+    found = {
+        (normalize_name(i["name"]), float(i["price"]), int(i["quantity"]))
+        for i in parsed["items"]
+    }
+    matched = len(expected & found)
+    precision = matched / len(found) if found else 0.0
+    recall = matched / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if matched else 0.0
+    return {
+        "item_precision": precision,
+        "item_recall": recall,
+        "item_f1": f1,
+        "total_correct": float(parsed["total"]) == float(truth["total"]),
+    }
+
+
+def summarize_scores(scores: list[dict]) -> dict:
+    if not scores:
+        return {}
+    return {
+        "item_precision": round(sum(s["item_precision"] for s in scores) / len(scores), 4),
+        "item_recall": round(sum(s["item_recall"] for s in scores) / len(scores), 4),
+        "item_f1": round(sum(s["item_f1"] for s in scores) / len(scores), 4),
+        "total_accuracy": round(sum(s["total_correct"] for s in scores) / len(scores), 4),
+    }
@@ -0,0 +1,116 @@
+"""Generate synthetic Vietnamese receipts with known items and totals.
+
+    python benchmarks/synthetic_receipts.py out/corpus --count 50 --seed 1
+
+Writes <name>.jpg and a <name>.json ground truth file per receipt in the
+format read by receipt_accuracy.load_corpus. Items are printed in the line
+styles parse_receipt_text understands, with the unit price on the line.
+"""
+import argparse
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+MENU = [
+    ("Phở bò tái", 45000),
+    ("Phở gà", 40000),
+    ("Bún chả", 50000),
+    ("Bún bò Huế", 55000),
+    ("Cơm tấm sườn", 45000),
+    ("Cơm gà xối mỡ", 55000),
+    ("Bánh mì thịt", 20000),
+    ("Gỏi cuốn", 30000),
+    ("Chả giò", 35000),
+    ("Cà phê sữa đá", 29000),
+    ("Trà đá", 5000),
+    ("Nước cam ép", 25000),
+    ("Sinh tố bơ", 35000),
+    ("Bia Hà Nội", 15000),
+    ("Lẩu thái", 250000),
+    ("Mực nướng", 120000),
+]
+
+SHOPS = ["QUÁN NGON", "PHỞ HÀ NỘI", "CƠM NHÀ", "CAFE SÀI GÒN", "BẾP VIỆT"]
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+
+def format_vnd(amount: int) -> str:
+    return f"{amount:,}".replace(",", ".")
+
+
+def find_font(path: str | None) -> str:
+    for candidate in [path] + FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    raise SystemExit("No font with Vietnamese glyphs found; pass --font")
+
+
+def make_receipt(rng: random.Random) -> tuple[list[str], dict]:
+    items = []
+    lines = [rng.choice(SHOPS), f"Bàn: {rng.randint(1, 20):02d}", "-" * 24]
+    for name, price in rng.sample(MENU, rng.randint(2, 6)):
+        quantity = rng.choice([1, 1, 1, 2, 3])
+        if quantity == 1:
+            lines.append(f"{name} {format_vnd(price)}")
+        elif rng.random() < 0.5:
+            lines.append(f"{name} x{quantity} {format_vnd(price)}")
+        else:
+            lines.append(f"{quantity} x {name} {format_vnd(price)}")
+        items.append({"name": name, "price": price, "quantity": quantity})
+
+    total = sum(item["price"] * item["quantity"] for item in items)
+    lines += ["-" * 24, f"Tổng cộng: {format_vnd(total)}", "Cảm ơn quý khách!"]
+    return lines, {"items": items, "total": total}
+
+
+def render(lines: list[str], font_path: str, rng: random.Random) -> Image.Image:
+    font = ImageFont.truetype(font_path, 34)
+    width = 760
+    line_height = 52
+    image = Image.new("RGB", (width, 80 + line_height * len(lines)), "white")
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((40, 40 + index * line_height), line, fill=(20, 20, 20), font=font)
+
+    # A little of what a phone photo adds: tilt, blur, a darker table around it
+    image = image.rotate(rng.uniform(-2, 2), expand=True, fillcolor=(90, 80, 70))
+    return image.filter(ImageFilter.GaussianBlur(rng.uniform(0, 0.8)))
+
+
+def generate(output: str, count: int, seed: int = 1, font: str | None = None) -> None:
+    font_path = find_font(font)
+    rng = random.Random(seed)
+    os.makedirs(output, exist_ok=True)
+
+    for index in range(count):
+        lines, truth = make_receipt(rng)
+        name = f"receipt_{index:04d}"
+        render(lines, font_path, rng).save(
+            os.path.join(output, name + ".jpg"), quality=rng.randint(70, 92)
+        )
+        with open(os.path.join(output, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(truth, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--font")
+    args = parser.parse_args()
+
+    generate(args.output, args.count, args.seed, args.font)
+    print(f"Wrote {args.count} receipts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
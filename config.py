@@ -9,6 +9,85 @@ class Settings(BaseSettings):
     cloudinary_api_key: str
     cloudinary_api_secret: str
     expo_access_token: str = ""
+    metrics_token: str = ""
+
+    cloudinary_api_url: str = "https://api.cloudinary.com/v1_1"
+    cloudinary_max_connections: int = 10
+    cloudinary_max_concurrency: int = 8
+    cloudinary_connect_timeout: float = 5
+    cloudinary_timeout: float = 30
+    cloudinary_max_retries: int = 3
+    cloudinary_retry_backoff: float = 0.5
+
+    image_store: str = "cloudinary"
+    local_image_store_dir: str = "uploads/receipts"
+    local_image_store_delay_ms: float = 0
+    receipt_upload_mode: str = "background"
+    receipt_staging_dir: str = "uploads/staging"
+    receipt_upload_workers: int = 4
+    receipt_upload_max_attempts: int = 5
+    receipt_upload_retry_delay: float = 2.0
+    receipt_renditions: bool = True
+    receipt_display_max_side: int = 1280
+    receipt_display_quality: int = 80
+    receipt_thumbnail_max_side: int = 320
+    receipt_thumbnail_quality: int = 70
+    receipt_gc_interval: int = 3600
+    receipt_gc_grace_hours: int = 24
+    receipt_gc_batch_size: int = 100
+    receipt_gc_max_calls_per_minute: float = 6
+
+    ocr_workers: int = 2
+    ocr_worker_threads: int = 1
+    ocr_start_method: str = "spawn"
+    ocr_preload: bool = False
+    ocr_warmup: bool = False
+    ocr_batch_size: int = 4
+    ocr_batch_wait_ms: float = 15
+    ocr_exif_rotate: bool = True
+    ocr_max_side: int = 1600
+    ocr_crop_receipt: bool = False
+    ocr_grayscale: bool = False
+    ocr_backend: str = "paddle"
+    ocr_onnx_model_dir: str = "models/onnx"
+    ocr_onnx_threads: int = 0
+    ocr_default_profile: str = "accurate"
+    ocr_fallback_queue_depth: int = 0
+    ocr_max_queue: int = 32
+    ocr_max_per_user: int = 2
+    ocr_retry_after_seconds: int = 5
+    receipt_cache_size: int = 256
+    receipt_max_upload_bytes: int = 15 * 1024 * 1024
+
+    receipt_job_queue: str = "database"
+    receipt_job_workers: int = 2
+    receipt_job_max_attempts: int = 3
+    receipt_job_poll_interval: float = 1.0
+    receipt_job_lease_seconds: int = 60
+    receipt_job_max_pending_per_user: int = 10
+    receipt_job_retention_hours: int = 24
+
+    expo_push_host: str = "https://exp.host"
+    expo_push_max_connections: int = 10
+    expo_push_max_concurrency: int = 4
+    expo_push_timeout: float = 30
+    expo_push_max_retries: int = 2
+    expo_push_retry_backoff: float = 0.5
+    notification_outbox_workers: int = 1
+    notification_outbox_batch_size: int = 400
+    notification_outbox_poll_interval: float = 1.0
+    notification_outbox_max_attempts: int = 5
+    notification_outbox_retry_delay: float = 5.0
+    notification_outbox_lease_seconds: int = 120
+    notification_outbox_dead_retention_days: int = 7
+    notification_receipt_delay: int = 900
+    notification_receipt_batch_size: int = 1000
+    notification_receipt_interval: float = 30
+    notification_digest_window: float = 30
+    unread_counter_cache_ttl: float = 5
+    unread_counter_cache_size: int = 10000
+    unread_counter_reconcile_interval: int = 3600
+    unread_counter_reconcile_batch_size: int = 1000
 
     class Config:
         env_file = ".env"
@@ -1,15 +1,47 @@
-from fastapi import FastAPI
+import secrets
+
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from config import get_settings
 from database import connect_db, disconnect_db
 from routers import auth, groups, expenses, receipts, invitations, notifications
+from services import metrics
+from services.auth_service import get_token_from_request
+from services.notification_outbox import start_outbox_workers, stop_outbox_workers
+from services.ocr_service import preload_ocr, shutdown_ocr_pool, warmup_ocr
+from services.receipt_gc import start_receipt_gc, stop_receipt_gc
+from services.receipt_jobs import start_job_workers, stop_job_workers
+from services.staged_uploads import start_upload_workers, stop_upload_workers
+from services.storage_service import close_image_store
+from services.unread_counter import start_unread_reconciliation, stop_unread_reconciliation
+
+settings = get_settings()
+
+if settings.ocr_preload:
+    # With `gunicorn --preload` this runs once in the master, before workers fork
+    preload_ocr()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_db()
+    if settings.ocr_warmup:
+        await warmup_ocr()
+    await start_upload_workers()
+    await start_job_workers()
+    await start_outbox_workers()
+    await start_receipt_gc()
+    await start_unread_reconciliation()
     yield
+    await stop_unread_reconciliation()
+    await stop_receipt_gc()
+    await stop_outbox_workers()
+    await stop_job_workers()
+    await stop_upload_workers()
+    shutdown_ocr_pool()
+    await close_image_store()
     await disconnect_db()
 
 
@@ -26,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -44,3 +77,17 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    # Off unless METRICS_TOKEN is set; scrapers send it as a bearer token
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    token = get_token_from_request(request) or ""
+    if not secrets.compare_digest(token.encode(), settings.metrics_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
+    return metrics.snapshot()
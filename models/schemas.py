@@ -88,6 +88,7 @@ class ExpenseUpdate(BaseModel):
 
 class ReceiptParseRequest(BaseModel):
     imageBase64: str
+    profile: Optional[str] = None
 
 
 class ReceiptItem(BaseModel):
@@ -98,12 +99,21 @@ class ReceiptItem(BaseModel):
 
 class ReceiptParseResponse(BaseModel):
     receiptId: str
-    imageUrl: str
+    imageUrl: Optional[str] = None
+    displayUrl: Optional[str] = None
+    thumbnailUrl: Optional[str] = None
     items: list[ReceiptItem]
     total: float
     message: str
 
 
+class ReceiptJobResponse(BaseModel):
+    jobId: str
+    status: str
+    result: Optional[ReceiptParseResponse] = None
+    error: Optional[str] = None
+
+
 class InvitationCreate(BaseModel):
     groupId: str
     inviteeUsername: str
@@ -9,6 +9,7 @@ from services.auth_service import (
     get_current_user,
     JwtPayload,
 )
+from services.notification_service import is_valid_expo_token
 
 router = APIRouter()
 
@@ -117,7 +118,13 @@ async def update_profile(
     if request.spendingLimit is not None:
         update_data["spendingLimit"] = request.spendingLimit
     if request.pushToken is not None:
-        update_data["pushToken"] = request.pushToken
+        # An empty string unregisters the device, e.g. on logout
+        if request.pushToken and not is_valid_expo_token(request.pushToken):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Push token không hợp lệ",
+            )
+        update_data["pushToken"] = request.pushToken or None
 
     if not update_data:
         raise HTTPException(
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, status, Depends, Query
 from database import db
 from models.schemas import ExpenseCreate, ExpenseSettle, ExpenseUpdate
 from services.auth_service import get_current_user, JwtPayload
+from services.notification_outbox import get_notification_outbox
 from services.notification_service import notify_group_members
 
 router = APIRouter()
@@ -64,55 +65,64 @@ async def create_expense(
             {"userId": m.userId, "amount": split_amount} for m in group.members
         ]
 
-    expense = await db.expense.create(
-        data={
-            "groupId": request.groupId,
-            "amount": request.amount,
-            "description": request.description,
-            "date": request.date if request.date else None,
-            "paidById": actual_payer_id,
-            "receiptId": request.receiptId,
-            "participants": {
-                "create": [
-                    {
-                        "userId": p["userId"] if isinstance(p, dict) else p.userId,
-                        "amount": p["amount"] if isinstance(p, dict) else p.amount,
-                        "settled": (p["userId"] if isinstance(p, dict) else p.userId)
-                        == actual_payer_id,
-                    }
-                    for p in participant_data
-                ]
-            },
-        },
-        include={
-            "paidBy": True,
-            "participants": {
-                "include": {"user": True}
+    # The push notifications are queued in the same transaction and sent by
+    # the outbox worker, so the response does not wait on Expo
+    async with db.tx() as transaction:
+        expense = await transaction.expense.create(
+            data={
+                "groupId": request.groupId,
+                "amount": request.amount,
+                "description": request.description,
+                "date": request.date if request.date else None,
+                "paidById": actual_payer_id,
+                "receiptId": request.receiptId,
+                "participants": {
+                    "create": [
+                        {
+                            "userId": p["userId"] if isinstance(p, dict) else p.userId,
+                            "amount": p["amount"] if isinstance(p, dict) else p.amount,
+                            "settled": (p["userId"] if isinstance(p, dict) else p.userId)
+                            == actual_payer_id,
+                        }
+                        for p in participant_data
+                    ]
+                },
             },
-            "group": {
-                "include": {
-                    "members": {
-                        "include": {"user": True}
+            include={
+                "paidBy": True,
+                "participants": {
+                    "include": {"user": True}
+                },
+                "group": {
+                    "include": {
+                        "members": {
+                            "include": {"user": True}
+                        }
                     }
-                }
+                },
             },
-        },
-    )
-
-    other_member_tokens = [
-        m.user.pushToken
-        for m in expense.group.members
-        if m.user.id != current_user.userId and m.user.pushToken
-    ]
-
-    if other_member_tokens:
-        await notify_group_members(
-            other_member_tokens,
-            expense.description,
-            expense.amount,
-            expense.paidBy.displayName,
         )
 
+        other_members = [
+            (m.user.id, m.user.pushToken)
+            for m in expense.group.members
+            if m.user.id != current_user.userId and m.user.pushToken
+        ]
+
+        queued = 0
+        if other_members:
+            queued = await notify_group_members(
+                transaction,
+                other_members,
+                expense.groupId,
+                expense.description,
+                expense.amount,
+                expense.paidBy.displayName,
+            )
+
+    if queued:
+        get_notification_outbox().wake()
+
     return expense
 
 
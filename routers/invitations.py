@@ -4,6 +4,7 @@ import secrets
 from database import db
 from models.schemas import InvitationCreate, InvitationResponse
 from services.auth_service import get_current_user, JwtPayload
+from services.unread_counter import create_notification
 
 router = APIRouter()
 
@@ -81,8 +82,8 @@ async def create_invitation(
         include={"group": True, "inviter": True, "invitee": True},
     )
 
-    await db.notification.create(
-        data={
+    await create_notification(
+        {
             "userId": invitee.id,
             "type": "invitation_received",
             "title": "Lời mời tham gia nhóm",
@@ -165,8 +166,8 @@ async def respond_invitation(
 
         user = await db.user.find_unique(where={"id": current_user.userId})
 
-        await db.notification.create(
-            data={
+        await create_notification(
+            {
                 "userId": invitation.inviterId,
                 "type": "invitation_accepted",
                 "title": "Lời mời được chấp nhận",
@@ -1,26 +1,69 @@
-from fastapi import APIRouter, Depends
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 
 from database import db
 from services.auth_service import get_current_user, JwtPayload
+from services.unread_counter import get_unread_count as read_unread_count, mark_read
 
 router = APIRouter()
 
 
+def encode_cursor(notification) -> str:
+    value = f"{notification.createdAt.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, notification_id = value.split("|", 1)
+        return datetime.fromisoformat(created_at), notification_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor không hợp lệ",
+        )
+
+
 @router.get("")
-async def get_notifications(current_user: JwtPayload = Depends(get_current_user)):
+async def get_notifications(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    unreadOnly: bool = False,
+    current_user: JwtPayload = Depends(get_current_user),
+):
+    # Keyset pagination on (createdAt, id), newest first, served by the
+    # (userId, createdAt, id) and (userId, read, createdAt, id) indexes. The
+    # cursor for the next page is returned in X-Next-Cursor.
+    where = {"userId": current_user.userId}
+    if unreadOnly:
+        where["read"] = False
+    if cursor:
+        created_at, notification_id = decode_cursor(cursor)
+        # The lte bound is what lets the index scan start at the cursor; the
+        # OR alone is only applied as a filter
+        where["createdAt"] = {"lte": created_at}
+        where["OR"] = [{"createdAt": {"lt": created_at}}, {"id": {"lt": notification_id}}]
+
     notifications = await db.notification.find_many(
-        where={"userId": current_user.userId},
-        order={"createdAt": "desc"},
-        take=50,
+        where=where,
+        order=[{"createdAt": "desc"}, {"id": "desc"}],
+        take=limit + 1,
     )
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(notifications[-1])
     return notifications
 
 
 @router.get("/unread-count")
 async def get_unread_count(current_user: JwtPayload = Depends(get_current_user)):
-    count = await db.notification.count(
-        where={"userId": current_user.userId, "read": False}
-    )
+    count = await read_unread_count(current_user.userId)
     return {"count": count}
 
 
@@ -28,17 +71,11 @@ async def get_unread_count(current_user: JwtPayload = Depends(get_current_user))
 async def mark_as_read(
     notification_id: str, current_user: JwtPayload = Depends(get_current_user)
 ):
-    await db.notification.update_many(
-        where={"id": notification_id, "userId": current_user.userId},
-        data={"read": True},
-    )
+    await mark_read(current_user.userId, notification_id)
     return {"message": "Đã đánh dấu đã đọc"}
 
 
 @router.patch("/read-all")
 async def mark_all_as_read(current_user: JwtPayload = Depends(get_current_user)):
-    await db.notification.update_many(
-        where={"userId": current_user.userId, "read": False},
-        data={"read": True},
-    )
+    await mark_read(current_user.userId)
     return {"message": "Đã đánh dấu tất cả đã đọc"}
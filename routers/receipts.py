@@ -1,14 +1,46 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+import asyncio
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, status, Depends, File, Form, Query, UploadFile
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from config import get_settings
 from database import db
-from models.schemas import ReceiptParseRequest, ReceiptParseResponse, ReceiptItem
+from models.schemas import ReceiptParseRequest, ReceiptParseResponse, ReceiptJobResponse
 from services.auth_service import get_current_user, JwtPayload
-from services.cloudinary_service import upload_image
-from services.ocr_service import parse_receipt_image
+from services.ocr_service import (
+    OcrBusyError,
+    UnknownOcrProfileError,
+    decode_image_base64,
+    ocr_admission,
+    resolve_profile,
+)
+from services.receipt_jobs import create_job
+from services.receipt_service import process_receipt
+
+settings = get_settings()
 
 router = APIRouter()
 
 
+def check_profile(profile: Optional[str]) -> None:
+    try:
+        resolve_profile(profile)
+    except UnknownOcrProfileError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chế độ quét hóa đơn không hợp lệ",
+        )
+
+
+def ocr_busy(e: OcrBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Hệ thống đang bận, vui lòng thử lại sau",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/parse", response_model=ReceiptParseResponse)
 async def parse_receipt(
     request: ReceiptParseRequest,
@@ -19,38 +51,195 @@ async def parse_receipt(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Vui lòng chọn ảnh hóa đơn",
         )
+    check_profile(request.profile)
 
     try:
-        upload_result = await upload_image(request.imageBase64)
-
-        parsed_data = await parse_receipt_image(request.imageBase64)
-
-        receipt = await db.receipt.create(
-            data={
-                "imageUrl": upload_result.url,
-                "publicId": upload_result.public_id,
-                "parsedData": {
-                    "items": [item.model_dump() for item in parsed_data.items],
-                    "total": parsed_data.total,
-                },
-                "uploadedById": current_user.userId,
-            }
+        async with ocr_admission.admit(current_user.userId):
+            image_data = decode_image_base64(request.imageBase64)
+            return await process_receipt(image_data, current_user.userId, request.profile)
+
+    except OcrBusyError as e:
+        raise ocr_busy(e)
+    except Exception as e:
+        print(f"Parse receipt error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Đã xảy ra lỗi khi phân tích hóa đơn",
         )
 
-        return ReceiptParseResponse(
-            receiptId=receipt.id,
-            imageUrl=receipt.imageUrl,
-            items=[
-                ReceiptItem(name=item.name, price=item.price, quantity=item.quantity)
-                for item in parsed_data.items
-            ],
-            total=parsed_data.total,
-            message="Đã phân tích hóa đơn thành công!",
+
+async def read_upload(file: UploadFile) -> bytes:
+    # Starlette has already spooled the part to a SpooledTemporaryFile and
+    # knows its size, so an oversized upload is rejected before it is read
+    if file.size is not None and file.size > settings.receipt_max_upload_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Ảnh hóa đơn quá lớn",
         )
+    return await file.read()
+
+
+@router.post("/parse-upload", response_model=ReceiptParseResponse)
+async def parse_receipt_upload(
+    file: UploadFile = File(...),
+    profile: Optional[str] = Form(None),
+    current_user: JwtPayload = Depends(get_current_user),
+):
+    check_profile(profile)
+
+    try:
+        # Admitted before the upload is read, so a rejected request never
+        # loads the image into memory
+        async with ocr_admission.admit(current_user.userId):
+            image_data = await read_upload(file)
+            if not image_data:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Vui lòng chọn ảnh hóa đơn",
+                )
+            return await process_receipt(image_data, current_user.userId, profile)
 
+    except OcrBusyError as e:
+        raise ocr_busy(e)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Parse receipt error: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Đã xảy ra lỗi khi phân tích hóa đơn",
         )
+
+
+def job_response(job) -> ReceiptJobResponse:
+    return ReceiptJobResponse(
+        jobId=job.id,
+        status=job.status,
+        result=job.result if job.status == "done" else None,
+        error="Đã xảy ra lỗi khi phân tích hóa đơn" if job.status == "failed" else None,
+    )
+
+
+async def get_user_job(job_id: str, user_id: str):
+    job = await db.receiptjob.find_unique(where={"id": job_id})
+    if not job or job.userId != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy yêu cầu phân tích",
+        )
+    return job
+
+
+@router.post(
+    "/jobs", response_model=ReceiptJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_receipt_job(
+    request: ReceiptParseRequest,
+    current_user: JwtPayload = Depends(get_current_user),
+):
+    if not request.imageBase64:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Vui lòng chọn ảnh hóa đơn",
+        )
+    check_profile(request.profile)
+    # Same limit as /parse-upload; base64 is 4 characters per 3 bytes
+    if len(request.imageBase64) * 3 // 4 > settings.receipt_max_upload_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Ảnh hóa đơn quá lớn",
+        )
+    # Jobs do not go through ocr_admission, which would only bound them
+    # while they run; this bounds how many images a user can queue
+    if settings.receipt_job_max_pending_per_user > 0:
+        queued = await db.receiptjob.count(
+            where={"userId": current_user.userId, "status": {"in": ["pending", "running"]}}
+        )
+        if queued >= settings.receipt_job_max_pending_per_user:
+            raise ocr_busy(OcrBusyError(settings.ocr_retry_after_seconds))
+
+    job = await create_job(request.imageBase64, current_user.userId, request.profile)
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReceiptJobResponse)
+async def get_receipt_job(
+    job_id: str, current_user: JwtPayload = Depends(get_current_user)
+):
+    job = await get_user_job(job_id, current_user.userId)
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_receipt_job(
+    job_id: str, current_user: JwtPayload = Depends(get_current_user)
+):
+    await get_user_job(job_id, current_user.userId)
+
+    async def events():
+        last_status = None
+        idle_polls = 0
+        while True:
+            job = await db.receiptjob.find_unique(where={"id": job_id})
+            if not job:
+                return
+            if job.status != last_status:
+                last_status = job.status
+                idle_polls = 0
+                payload = job_response(job).model_dump_json()
+                yield f"event: status\ndata: {payload}\n\n"
+                if job.status in ("done", "failed"):
+                    return
+            else:
+                idle_polls += 1
+                # Keep proxies and mobile networks from closing an idle stream
+                if idle_polls * settings.receipt_job_poll_interval >= 15:
+                    idle_polls = 0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(settings.receipt_job_poll_interval)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{receipt_id}/image")
+async def get_receipt_image(
+    receipt_id: str,
+    size: str = Query("display", pattern="^(original|display|thumbnail)$"),
+    current_user: JwtPayload = Depends(get_current_user),
+):
+    receipt = await db.receipt.find_unique(where={"id": receipt_id})
+    if not receipt:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Hóa đơn không tồn tại",
+        )
+
+    if receipt.uploadedById != current_user.userId:
+        shared = await db.expense.find_first(
+            where={
+                "receiptId": receipt_id,
+                "group": {"members": {"some": {"userId": current_user.userId}}},
+            }
+        )
+        if not shared:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Bạn không có quyền xem hóa đơn này",
+            )
+
+    # Receipts saved before renditions existed only have the original
+    urls = {
+        "original": receipt.imageUrl,
+        "display": receipt.displayUrl or receipt.imageUrl,
+        "thumbnail": receipt.thumbnailUrl or receipt.displayUrl or receipt.imageUrl,
+    }
+    if not urls[size]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ảnh hóa đơn chưa sẵn sàng",
+        )
+    return RedirectResponse(urls[size], status_code=status.HTTP_307_TEMPORARY_REDIRECT)
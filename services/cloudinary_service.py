@@ -1,8 +1,16 @@
+import asyncio
+import base64
+import time
+import uuid
+from typing import Optional
+
 import cloudinary
-import cloudinary.uploader
+import cloudinary.utils
+import httpx
 from pydantic import BaseModel
 
 from config import get_settings
+from services.http_retry import send_with_retry
 
 settings = get_settings()
 
@@ -12,20 +20,144 @@ cloudinary.config(
     api_secret=settings.cloudinary_api_secret,
 )
 
+RECEIPT_FOLDER = "chiatien/receipts"
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+MAX_DELETE_BATCH = 100
+
+client: Optional["CloudinaryClient"] = None
+
 
 class UploadResult(BaseModel):
     url: str
     public_id: str
 
 
-async def upload_image(base64_data: str) -> UploadResult:
-    result = cloudinary.uploader.upload(
-        base64_data,
-        folder="chiatien/receipts",
-        resource_type="image",
-    )
-    return UploadResult(url=result["secure_url"], public_id=result["public_id"])
+class CloudinaryClient:
+    # Talks to the Cloudinary upload API over one pooled httpx client instead
+    # of the blocking SDK, which opened a connection per call and held a
+    # thread for the whole round trip.
+    def __init__(
+        self,
+        api_url: str,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        max_connections: int = 10,
+        max_concurrency: int = 8,
+        connect_timeout: float = 5,
+        timeout: float = 30,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ):
+        self.base_url = f"{api_url.rstrip('/')}/{cloud_name}/image"
+        self.admin_url = f"{api_url.rstrip('/')}/{cloud_name}"
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        credentials = base64.b64encode(f"{api_key}:{api_secret}".encode()).decode()
+        self._admin_headers = {"Authorization": f"Basic {credentials}"}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    def _signed(self, params: dict) -> dict:
+        params = {**params, "timestamp": int(time.time())}
+        signature = cloudinary.utils.api_sign_request(params, self.api_secret)
+        return {**params, "signature": signature, "api_key": self.api_key}
+
+    async def _send(self, request_factory) -> httpx.Response:
+        return await send_with_retry(
+            self._http,
+            request_factory,
+            self.max_retries + 1,
+            self.retry_backoff,
+            semaphore=self._semaphore,
+            retry_statuses=RETRY_STATUSES,
+        )
+
+    async def _post(self, action: str, params: dict, files: Optional[dict] = None) -> dict:
+        # Signed per attempt: the timestamp must be recent
+        response = await self._send(
+            lambda: self._http.build_request(
+                "POST", f"{self.base_url}/{action}", data=self._signed(params), files=files
+            ),
+        )
+        return response.json()
+
+    async def upload(self, image_data: bytes, folder: str = RECEIPT_FOLDER) -> UploadResult:
+        # The public id is chosen here so a retried upload overwrites the
+        # same asset instead of creating a second one
+        params = {"folder": folder, "public_id": uuid.uuid4().hex, "overwrite": "true"}
+        result = await self._post(
+            "upload", params, files={"file": ("receipt.jpg", image_data, "image/jpeg")}
+        )
+        return UploadResult(url=result["secure_url"], public_id=result["public_id"])
+
+    async def destroy(self, public_id: str) -> None:
+        await self._post("destroy", {"public_id": public_id})
+
+    async def delete_resources(self, public_ids: list[str]) -> int:
+        # Admin API: up to MAX_DELETE_BATCH ids per call, basic auth instead of
+        # a signature. Admin calls are rate limited per hour, so callers
+        # should batch.
+        response = await self._send(
+            lambda: self._http.build_request(
+                "DELETE",
+                f"{self.admin_url}/resources/image/upload",
+                params=[("public_ids[]", public_id) for public_id in public_ids],
+                headers=self._admin_headers,
+            ),
+        )
+        deleted = response.json().get("deleted", {})
+        return sum(1 for status in deleted.values() if status == "deleted")
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+def get_client() -> CloudinaryClient:
+    global client
+    if client is None:
+        client = CloudinaryClient(
+            settings.cloudinary_api_url,
+            settings.cloudinary_cloud_name,
+            settings.cloudinary_api_key,
+            settings.cloudinary_api_secret,
+            max_connections=settings.cloudinary_max_connections,
+            max_concurrency=settings.cloudinary_max_concurrency,
+            connect_timeout=settings.cloudinary_connect_timeout,
+            timeout=settings.cloudinary_timeout,
+            max_retries=settings.cloudinary_max_retries,
+            retry_backoff=settings.cloudinary_retry_backoff,
+        )
+    return client
+
+
+async def close_client() -> None:
+    global client
+    if client is not None:
+        await client.close()
+        client = None
+
+
+async def upload_image(image_data: bytes) -> UploadResult:
+    # Raw bytes go up as a multipart file part, a third smaller than base64
+    return await get_client().upload(image_data)
 
 
 async def delete_image(public_id: str) -> None:
-    cloudinary.uploader.destroy(public_id)
+    await get_client().destroy(public_id)
+
+
+async def delete_images(public_ids: list[str]) -> int:
+    client = get_client()
+    deleted = 0
+    for start in range(0, len(public_ids), MAX_DELETE_BATCH):
+        deleted += await client.delete_resources(public_ids[start : start + MAX_DELETE_BATCH])
+    return deleted
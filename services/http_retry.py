@@ -0,0 +1,34 @@
+import asyncio
+import contextlib
+import random
+from typing import Callable, Optional
+
+import httpx
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+async def send_with_retry(
+    client: httpx.AsyncClient,
+    request_factory: Callable[[], httpx.Request],
+    attempts: int,
+    base_delay: float,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    retry_statuses: set[int] = RETRY_STATUSES,
+) -> httpx.Response:
+    # Retries timeouts, connection errors and retry_statuses; other error
+    # responses raise right away. request_factory is called per attempt so a
+    # request can be signed afresh. The semaphore is held across attempts.
+    async with semaphore or contextlib.nullcontext():
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = await client.send(request_factory())
+                if last_attempt or response.status_code not in retry_statuses:
+                    response.raise_for_status()
+                    return response
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            # Full jitter so clients that failed together do not retry together
+            await asyncio.sleep(random.uniform(0, base_delay * 2**attempt))
@@ -0,0 +1,109 @@
+import asyncio
+import io
+from typing import Optional
+
+from pydantic import BaseModel
+
+from config import get_settings
+from services import metrics
+from services.cloudinary_service import UploadResult
+
+settings = get_settings()
+
+
+class RenditionOptions(BaseModel):
+    display_max_side: int = 1280
+    display_quality: int = 80
+    thumbnail_max_side: int = 320
+    thumbnail_quality: int = 70
+
+
+class ReceiptImageUploads(BaseModel):
+    original: UploadResult
+    display: Optional[UploadResult] = None
+    thumbnail: Optional[UploadResult] = None
+
+    def fields(self) -> dict:
+        return {
+            "imageUrl": self.original.url,
+            "publicId": self.original.public_id,
+            "displayUrl": self.display.url if self.display else None,
+            "displayPublicId": self.display.public_id if self.display else None,
+            "thumbnailUrl": self.thumbnail.url if self.thumbnail else None,
+            "thumbnailPublicId": self.thumbnail.public_id if self.thumbnail else None,
+        }
+
+    def public_ids(self) -> list[str]:
+        return [
+            upload.public_id
+            for upload in (self.original, self.display, self.thumbnail)
+            if upload
+        ]
+
+
+def get_rendition_options() -> RenditionOptions:
+    return RenditionOptions(
+        display_max_side=settings.receipt_display_max_side,
+        display_quality=settings.receipt_display_quality,
+        thumbnail_max_side=settings.receipt_thumbnail_max_side,
+        thumbnail_quality=settings.receipt_thumbnail_quality,
+    )
+
+
+def _encode(image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    # No exif= argument: phone metadata (GPS included) is not copied over
+    image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def make_renditions(image_data: bytes, options: RenditionOptions) -> dict[str, bytes]:
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(image_data))
+    # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that is still large
+    # enough for the display size
+    image.draft("RGB", (options.display_max_side, options.display_max_side))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    image.thumbnail((options.display_max_side, options.display_max_side), Image.LANCZOS)
+    display = _encode(image, options.display_quality)
+    image.thumbnail((options.thumbnail_max_side, options.thumbnail_max_side), Image.LANCZOS)
+    thumbnail = _encode(image, options.thumbnail_quality)
+    return {"display": display, "thumbnail": thumbnail}
+
+
+async def upload_receipt_images(store, image_data: bytes) -> ReceiptImageUploads:
+    # The original is kept as is for "view full size"; lists and detail views
+    # load the much smaller renditions
+    renditions: dict[str, bytes] = {}
+    if settings.receipt_renditions:
+        try:
+            renditions = await asyncio.to_thread(
+                make_renditions, image_data, get_rendition_options()
+            )
+        except Exception as e:
+            print(f"Receipt rendition error: {e}")
+
+    names = ["original", *renditions]
+    payloads = [image_data, *renditions.values()]
+    results = await asyncio.gather(
+        *(store.upload(payload) for payload in payloads), return_exceptions=True
+    )
+
+    uploads = {}
+    for name, payload, result in zip(names, payloads, results):
+        if isinstance(result, BaseException):
+            print(f"Receipt {name} upload error: {result}")
+            continue
+        uploads[name] = result
+        metrics.incr(f"receipt_images.bytes.{name}", len(payload))
+
+    if "original" not in uploads:
+        for result in uploads.values():
+            try:
+                await store.delete(result.public_id)
+            except Exception as e:
+                print(f"Receipt image cleanup error: {e}")
+        raise results[0]
+    return ReceiptImageUploads(**uploads)
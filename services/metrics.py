@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+counters: dict[str, float] = defaultdict(float)
+gauges: dict[str, float] = {}
+timings: dict[str, dict[str, float]] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    counters[name] += value
+
+
+def set_gauge(name: str, value: float) -> None:
+    gauges[name] = value
+
+
+def observe(name: str, seconds: float) -> None:
+    timing = timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+    timing["count"] += 1
+    timing["sum"] += seconds
+    timing["max"] = max(timing["max"], seconds)
+
+
+def snapshot() -> dict:
+    return {
+        "counters": dict(counters),
+        "gauges": dict(gauges),
+        "timings": {
+            name: {**timing, "mean": timing["sum"] / timing["count"]}
+            for name, timing in timings.items()
+        },
+    }
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config import get_settings
+from database import db
+from services import metrics, push_client
+from services.notification_service import expense_digest, prune_push_tokens
+
+settings = get_settings()
+
+outbox: Optional["NotificationOutbox"] = None
+outbox_workers: list[asyncio.Task] = []
+
+# Retrying cannot fix these; InvalidCredentials is a config problem and
+# would dead-letter every message, so it is retried like a server error
+PERMANENT_ERRORS = {"DeviceNotRegistered", "MessageTooBig"}
+# Expo keeps receipts for a day
+RECEIPT_TTL = timedelta(hours=24)
+# How often the receipt worker deletes expired dead rows
+DEAD_PRUNE_INTERVAL = 3600
+
+
+class NotificationOutbox:
+    # Push notifications are written to the NotificationOutbox table in the
+    # same transaction as the change they announce, and sent from here. Rows
+    # are claimed with SKIP LOCKED so every API process can run workers.
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        retry_delay: float,
+        lease_seconds: int,
+        receipt_delay: int,
+        receipt_batch_size: int,
+        dead_retention_days: int,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.receipt_delay = receipt_delay
+        self.receipt_batch_size = receipt_batch_size
+        self.dead_retention_days = dead_retention_days
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def claim(self) -> list[dict]:
+        # Rows still 'sending' after the lease were claimed by a worker that
+        # died or whose delivery raised, and are sent again
+        return await db.query_raw(
+            """
+            UPDATE "NotificationOutbox"
+            SET "status" = 'sending', "attempts" = "attempts" + 1, "updatedAt" = NOW()
+            WHERE "id" IN (
+                SELECT "id" FROM "NotificationOutbox"
+                WHERE ("status" = 'pending' AND "availableAt" <= NOW())
+                   OR ("status" = 'sending'
+                       AND "updatedAt" < NOW() - make_interval(secs => $2::int))
+                ORDER BY "availableAt", "userId", "groupId"
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "id", "userId", "groupId", "pushToken", "title", "body", "data", "attempts"
+            """,
+            self.batch_size,
+            self.lease_seconds,
+        )
+
+    async def next_batch(self) -> list[dict]:
+        while True:
+            rows = await self.claim()
+            if rows:
+                return rows
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _coalesce(self, rows: list[dict]) -> list[list[dict]]:
+        # New-expense pushes for one user and group that came due together
+        # (see enqueue_push_notifications) become one digest
+        batches: dict = {}
+        for row in rows:
+            # Raw queries return Json columns as text
+            if isinstance(row["data"], str):
+                row["data"] = json.loads(row["data"])
+            if row["groupId"] and (row["data"] or {}).get("type") == "new_expense":
+                key = (row["userId"], row["groupId"], row["pushToken"])
+            else:
+                key = row["id"]
+            batches.setdefault(key, []).append(row)
+        return list(batches.values())
+
+    def _message(self, batch: list[dict]) -> dict:
+        row = batch[0]
+        if len(batch) == 1:
+            title, body, data = row["title"], row["body"], row["data"]
+        else:
+            digest = expense_digest(row["groupId"], [row["data"] for row in batch])
+            title, body, data = digest.title, digest.body, digest.data
+        return {"to": row["pushToken"], "title": title, "body": body, "data": data}
+
+    async def deliver(self, rows: list[dict]) -> None:
+        # Reclaimed after their delivery was interrupted too many times
+        stuck = [row["id"] for row in rows if row["attempts"] > self.max_attempts]
+        if stuck:
+            await self._dead_letter(stuck, "Interrupted too many times")
+            rows = [row for row in rows if row["attempts"] <= self.max_attempts]
+            if not rows:
+                return
+
+        batches = self._coalesce(rows)
+        metrics.incr("notification_outbox.coalesced", len(rows) - len(batches))
+
+        start = time.perf_counter()
+        tickets = await push_client.get_client().send([self._message(batch) for batch in batches])
+        metrics.observe("notification_outbox.send", time.perf_counter() - start)
+
+        sent = []
+        failed: dict[str, list[dict]] = defaultdict(list)
+        for batch, ticket in zip(batches, tickets):
+            if ticket.is_success():
+                sent.extend((row["id"], ticket.id) for row in batch)
+            else:
+                failed[ticket.error or ticket.message].extend(batch)
+
+        if sent:
+            # Kept until the delivery receipt is checked
+            check_at = datetime.now(timezone.utc) + timedelta(seconds=self.receipt_delay)
+            async with db.batch_() as batcher:
+                for row_id, ticket_id in sent:
+                    batcher.notificationoutbox.update(
+                        where={"id": row_id},
+                        data={"status": "sent", "ticketId": ticket_id, "availableAt": check_at},
+                    )
+            metrics.incr("notification_outbox.sent", len(sent))
+        await self._handle_errors(failed)
+
+    async def _handle_errors(self, failed: dict[str, list[dict]]) -> None:
+        for error, failed_rows in failed.items():
+            if error in PERMANENT_ERRORS:
+                await self._dead_letter([row["id"] for row in failed_rows], error)
+            else:
+                await self._retry(failed_rows, error)
+
+        # The app was uninstalled or the token rotated; stop sending to it
+        unregistered = failed.get("DeviceNotRegistered", [])
+        await prune_push_tokens([row["pushToken"] for row in unregistered], "DeviceNotRegistered")
+
+    async def claim_receipts(self) -> list[dict]:
+        # Pushes availableAt forward as a lease, so a row whose receipt is
+        # not ready yet is looked at again later
+        return await db.query_raw(
+            """
+            UPDATE "NotificationOutbox"
+            SET "availableAt" = NOW() + make_interval(secs => $2::int)
+            WHERE "id" IN (
+                SELECT "id" FROM "NotificationOutbox"
+                WHERE "status" = 'sent' AND "availableAt" <= NOW()
+                ORDER BY "availableAt"
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "id", "pushToken", "ticketId", "attempts", "createdAt"
+            """,
+            self.receipt_batch_size,
+            self.lease_seconds,
+        )
+
+    async def check_receipts(self, rows: list[dict]) -> None:
+        # Rows merged into one digest share its ticket
+        receipts = await push_client.get_client().get_receipts(
+            list(dict.fromkeys(row["ticketId"] for row in rows))
+        )
+
+        done = []
+        failed: dict[str, list[dict]] = defaultdict(list)
+        expire_before = datetime.now(timezone.utc) - RECEIPT_TTL
+        for row in rows:
+            receipt = receipts.get(row["ticketId"])
+            if receipt is None:
+                created_at = row["createdAt"]
+                if isinstance(created_at, str):
+                    created_at = datetime.fromisoformat(created_at)
+                if created_at < expire_before:
+                    done.append(row["id"])
+                    metrics.incr("notification_outbox.receipt_expired")
+            elif receipt.is_success():
+                done.append(row["id"])
+                metrics.incr("notification_outbox.delivered")
+            else:
+                failed[receipt.error or receipt.message].append(row)
+
+        if done:
+            await db.notificationoutbox.delete_many(where={"id": {"in": done}})
+        await self._handle_errors(failed)
+
+    async def prune_dead(self) -> int:
+        # Dead rows are kept for a while to look into, then dropped
+        expire_before = datetime.now(timezone.utc) - timedelta(days=self.dead_retention_days)
+        count = await db.notificationoutbox.delete_many(
+            where={"status": "dead", "updatedAt": {"lt": expire_before}}
+        )
+        metrics.incr("notification_outbox.dead_pruned", count)
+        return count
+
+    async def _dead_letter(self, ids: list[str], error: str) -> None:
+        await db.notificationoutbox.update_many(
+            where={"id": {"in": ids}}, data={"status": "dead", "error": error}
+        )
+        metrics.incr("notification_outbox.dead", len(ids))
+
+    async def _retry(self, rows: list[dict], error: str) -> None:
+        by_attempts = defaultdict(list)
+        for row in rows:
+            by_attempts[row["attempts"]].append(row["id"])
+
+        for attempts, ids in by_attempts.items():
+            if attempts >= self.max_attempts:
+                await self._dead_letter(ids, error)
+                continue
+            # Jittered so a batch that failed together is not retried together
+            delay = random.uniform(0.5, 1) * self.retry_delay * 2 ** (attempts - 1)
+            await db.notificationoutbox.update_many(
+                where={"id": {"in": ids}},
+                data={
+                    "status": "pending",
+                    "error": error,
+                    "availableAt": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                },
+            )
+            metrics.incr("notification_outbox.retried", len(ids))
+
+
+def get_notification_outbox() -> NotificationOutbox:
+    global outbox
+    if outbox is None:
+        outbox = NotificationOutbox(
+            settings.notification_outbox_batch_size,
+            settings.notification_outbox_poll_interval,
+            settings.notification_outbox_max_attempts,
+            settings.notification_outbox_retry_delay,
+            settings.notification_outbox_lease_seconds,
+            settings.notification_receipt_delay,
+            settings.notification_receipt_batch_size,
+            settings.notification_outbox_dead_retention_days,
+        )
+    return outbox
+
+
+async def _outbox_worker(outbox: NotificationOutbox) -> None:
+    while True:
+        try:
+            rows = await outbox.next_batch()
+        except Exception as e:
+            print(f"Notification outbox claim error: {e}")
+            await asyncio.sleep(outbox.poll_interval)
+            continue
+        try:
+            await outbox.deliver(rows)
+        except Exception as e:
+            print(f"Notification outbox worker error: {e}")
+
+
+async def _receipt_worker(outbox: NotificationOutbox) -> None:
+    pruned_at = None
+    while True:
+        if outbox.dead_retention_days > 0 and (
+            pruned_at is None or time.monotonic() - pruned_at >= DEAD_PRUNE_INTERVAL
+        ):
+            pruned_at = time.monotonic()
+            try:
+                await outbox.prune_dead()
+            except Exception as e:
+                print(f"Notification outbox prune error: {e}")
+        try:
+            rows = await outbox.claim_receipts()
+            if rows:
+                await outbox.check_receipts(rows)
+                continue
+        except Exception as e:
+            print(f"Notification receipt worker error: {e}")
+        await asyncio.sleep(settings.notification_receipt_interval)
+
+
+async def start_outbox_workers() -> None:
+    outbox = get_notification_outbox()
+    for _ in range(settings.notification_outbox_workers):
+        outbox_workers.append(asyncio.create_task(_outbox_worker(outbox)))
+    outbox_workers.append(asyncio.create_task(_receipt_worker(outbox)))
+
+
+async def stop_outbox_workers() -> None:
+    for task in outbox_workers:
+        task.cancel()
+    await asyncio.gather(*outbox_workers, return_exceptions=True)
+    outbox_workers.clear()
+    await push_client.close_client()
@@ -1,16 +1,16 @@
+import re
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from pydantic import BaseModel
-from exponent_server_sdk import (
-    DeviceNotRegisteredError,
-    PushClient,
-    PushMessage,
-    PushServerError,
-)
 
 from config import get_settings
+from database import db
+from services import metrics
 
 settings = get_settings()
 
+EXPO_TOKEN_PATTERN = re.compile(r"^Expo(nent)?PushToken\[[^\[\]\s]+\]$")
+
 
 class NotificationPayload(BaseModel):
     title: str
@@ -18,54 +18,116 @@ class NotificationPayload(BaseModel):
     data: Optional[dict] = None
 
 
+def format_amount(amount: float) -> str:
+    return f"{amount:,.0f}".replace(",", ".")
+
+
 def is_valid_expo_token(token: str) -> bool:
-    return token.startswith("ExponentPushToken[") or token.startswith("ExpoPushToken[")
+    return EXPO_TOKEN_PATTERN.match(token) is not None
+
+
+async def prune_push_tokens(tokens: list[str], reason: str, client=db) -> int:
+    # Clears the tokens from every user still registered with them and drops
+    # their queued pushes, in one update each
+    tokens = list(set(tokens))
+    if not tokens:
+        return 0
+    pruned = await client.user.update_many(
+        where={"pushToken": {"in": tokens}}, data={"pushToken": None}
+    )
+    avoided = await client.notificationoutbox.update_many(
+        where={"pushToken": {"in": tokens}, "status": "pending"},
+        data={"status": "dead", "error": reason},
+    )
+    metrics.incr("push_tokens.pruned", pruned)
+    metrics.incr("push.sends_avoided", avoided)
+    return pruned
 
 
-async def send_push_notifications(
-    push_tokens: list[str], payload: NotificationPayload
-) -> list:
-    messages = []
-    for token in push_tokens:
+async def enqueue_push_notifications(
+    client,
+    recipients: list[tuple[str, str]],
+    payload: NotificationPayload,
+    group_id: Optional[str] = None,
+) -> int:
+    # Written with `client`, normally the transaction that made the change the
+    # notification is about; the outbox worker sends them once it commits
+    rows = []
+    invalid = []
+    for user_id, token in recipients:
         if not is_valid_expo_token(token):
-            print(f"Push token {token} is not a valid Expo push token")
+            # Saved before PATCH /me validated tokens
+            invalid.append(token)
             continue
-
-        messages.append(
-            PushMessage(
-                to=token,
-                title=payload.title,
-                body=payload.body,
-                data=payload.data,
-            )
+        rows.append(
+            {
+                "userId": user_id,
+                "pushToken": token,
+                "title": payload.title,
+                "body": payload.body,
+                "data": payload.data,
+            }
         )
 
-    if not messages:
-        return []
+    if invalid:
+        metrics.incr("push.sends_avoided", len(invalid))
+        await prune_push_tokens(invalid, "InvalidToken", client)
+    if not rows:
+        return 0
 
-    try:
-        push_client = PushClient()
-        responses = push_client.publish_multiple(messages)
-        return responses
-    except PushServerError as e:
-        print(f"Error sending push notifications: {e}")
-        return []
-    except DeviceNotRegisteredError:
-        return []
+    if group_id and settings.notification_digest_window > 0:
+        # Held back for the digest window. A user who already has a push for
+        # this group waiting joins that window, so the whole burst is claimed
+        # together and sent as one digest.
+        window_end = datetime.now(timezone.utc) + timedelta(
+            seconds=settings.notification_digest_window
+        )
+        waiting = await client.notificationoutbox.find_many(
+            where={
+                "groupId": group_id,
+                "userId": {"in": [row["userId"] for row in rows]},
+                "status": "pending",
+            }
+        )
+        open_windows = {row.userId: row.availableAt for row in waiting}
+        for row in rows:
+            row["groupId"] = group_id
+            row["availableAt"] = open_windows.get(row["userId"], window_end)
+    return await client.notificationoutbox.create_many(data=rows)
 
 
 async def notify_group_members(
-    member_push_tokens: list[str],
+    client,
+    member_recipients: list[tuple[str, str]],
+    group_id: str,
     expense_title: str,
     amount: float,
     paid_by_name: str,
-) -> None:
-    formatted_amount = f"{amount:,.0f}".replace(",", ".")
-    await send_push_notifications(
-        member_push_tokens,
+) -> int:
+    return await enqueue_push_notifications(
+        client,
+        member_recipients,
         NotificationPayload(
             title="Chi tiêu mới 💸",
-            body=f'{paid_by_name} đã thêm "{expense_title}" - {formatted_amount}₫',
-            data={"type": "new_expense"},
+            body=f'{paid_by_name} đã thêm "{expense_title}" - {format_amount(amount)}₫',
+            data={
+                "type": "new_expense",
+                "groupId": group_id,
+                "amount": amount,
+                "paidBy": paid_by_name,
+            },
         ),
+        group_id,
+    )
+
+
+def expense_digest(group_id: str, expenses: list[dict]) -> NotificationPayload:
+    # `expenses` are the data of the new_expense pushes being merged
+    payers = list(dict.fromkeys(expense["paidBy"] for expense in expenses))
+    who = payers[0] if len(payers) == 1 else f"{payers[0]} và {len(payers) - 1} người khác"
+    total = sum(expense["amount"] for expense in expenses)
+    return NotificationPayload(
+        title="Chi tiêu mới 💸",
+        body=f"{who} đã thêm {len(expenses)} chi tiêu - tổng {format_amount(total)}₫",
+        data={"type": "new_expense_digest", "groupId": group_id, "count": len(expenses)},
     )
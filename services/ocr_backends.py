@@ -0,0 +1,126 @@
+import os
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class OcrBackend(ABC):
+    # Text detection and recognition for one OCR profile. Callers detect per
+    # image, then recognize the crops of a whole batch in one call.
+    drop_score: float = 0.5
+
+    @abstractmethod
+    def detect(self, image: "np.ndarray") -> list["np.ndarray"]:
+        """Text boxes in reading order (top to bottom, left to right)."""
+
+    @abstractmethod
+    def crop(self, image: "np.ndarray", box: "np.ndarray") -> "np.ndarray": ...
+
+    @abstractmethod
+    def recognize(self, crops: list["np.ndarray"]) -> list[tuple[str, float]]: ...
+
+    def read(self, image: "np.ndarray") -> list[tuple[str, float]]:
+        crops = [self.crop(image, box) for box in self.detect(image)]
+        return self.recognize(crops) if crops else []
+
+
+class PaddleBackend(OcrBackend):
+    # PaddlePaddle inference through PaddleOCR's own predictors
+    def __init__(self, options: dict, threads: int):
+        self.engine = self._build(options, threads)
+        self.drop_score = self.engine.drop_score
+
+    def _build(self, options: dict, threads: int):
+        from paddleocr import PaddleOCR
+
+        return PaddleOCR(lang="vi", cpu_threads=threads, show_log=False, **options)
+
+    def detect(self, image: "np.ndarray") -> list["np.ndarray"]:
+        from tools.infer.predict_system import sorted_boxes
+
+        boxes, _ = self.engine.text_detector(image)
+        if boxes is None or len(boxes) == 0:
+            return []
+        return sorted_boxes(boxes)
+
+    def crop(self, image: "np.ndarray", box: "np.ndarray") -> "np.ndarray":
+        from tools.infer.utility import get_rotate_crop_image
+
+        return get_rotate_crop_image(image, box.copy())
+
+    def recognize(self, crops: list["np.ndarray"]) -> list[tuple[str, float]]:
+        if self.engine.use_angle_cls:
+            crops, _, _ = self.engine.text_classifier(crops)
+        results, _ = self.engine.text_recognizer(crops)
+        return results
+
+
+class OnnxBackend(PaddleBackend):
+    # The same models exported with paddle2onnx and run under ONNX Runtime.
+    # PaddleOCR still does the resizing, DB box post-processing and CTC
+    # decoding; only the inference sessions are ours.
+    def __init__(self, options: dict, threads: int, model_dir: str):
+        self.model_dir = model_dir
+        super().__init__(options, threads)
+
+    def _model_path(self, name: str) -> str:
+        path = os.path.join(self.model_dir, f"{name}.onnx")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ONNX model not found: {path}")
+        return path
+
+    def _build(self, options: dict, threads: int):
+        import onnxruntime as ort
+        from paddleocr import PaddleOCR
+        from tools.infer import utility
+
+        # The angle classifier is only built (and cls.onnx only needed) when
+        # the profile uses it
+        names = ["det", "rec"]
+        if options.get("use_angle_cls"):
+            names.append("cls")
+        paths = {name: self._model_path(name) for name in names}
+
+        # PaddleOCR would open its sessions with default options, which size
+        # the thread pool to every core on the box, and has no argument to
+        # change that. Swap in our own session factory while it builds the
+        # predictors so each model is loaded once, with our limit.
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = threads
+        session_options.inter_op_num_threads = 1
+        session_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        def create_predictor(args, mode, logger):
+            session = ort.InferenceSession(
+                paths[mode], session_options, providers=["CPUExecutionProvider"]
+            )
+            return session, session.get_inputs()[0], None, None
+
+        default_create_predictor = utility.create_predictor
+        utility.create_predictor = create_predictor
+        try:
+            return PaddleOCR(
+                lang="vi",
+                use_onnx=True,
+                det_model_dir=paths["det"],
+                rec_model_dir=paths["rec"],
+                cls_model_dir=paths.get("cls"),
+                show_log=False,
+                **options,
+            )
+        finally:
+            utility.create_predictor = default_create_predictor
+
+
+BACKENDS = ("paddle", "onnx")
+
+
+def create_backend(name: str, options: dict, threads: int, onnx_model_dir: str) -> OcrBackend:
+    if name == "onnx":
+        return OnnxBackend(options, threads, onnx_model_dir)
+    if name == "paddle":
+        return PaddleBackend(options, threads)
+    raise ValueError(f"Unknown OCR backend: {name}")
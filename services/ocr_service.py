@@ -1,127 +1,365 @@
-import re
-import base64
-import tempfile
+import binascii
 import os
+import gc
+import asyncio
+import importlib.util
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from typing import Optional
-from pydantic import BaseModel
 
-ocr_available = False
-ocr_instance = None
+from config import get_settings
+from services.image_preprocess import PreprocessOptions, preprocess_image
+from services.ocr_backends import OcrBackend, create_backend
+from services.receipt_parser import ParsedReceipt, ReceiptItem, parse_receipt_text
+from services import metrics
+from services.receipt_cache import hash_image, receipt_cache
 
-try:
-    from paddleocr import PaddleOCR
-    ocr_available = True
-except ImportError:
+settings = get_settings()
+
+# PaddleOCR arguments per named profile. "accurate" is the original setup;
+# "fast" skips the angle classifier and detects on a smaller image.
+OCR_PROFILES = {
+    "accurate": {"use_angle_cls": True, "det_limit_side_len": 960},
+    "fast": {"use_angle_cls": False, "det_limit_side_len": 640},
+}
+FALLBACK_PROFILE = "fast"
+
+ocr_instances: dict[str, OcrBackend] = {}
+ocr_pool: Optional[ProcessPoolExecutor] = None
+# Batches handed to the pool and not finished yet, across all batchers
+running_batches: set[asyncio.Task] = set()
+ocr_batchers: dict[str, "OcrBatcher"] = {}
+
+# paddleocr pulls in paddle, cv2 and friends, which takes seconds and a lot of
+# memory. Only check that it is installed here; it is imported on first use.
+ocr_available = importlib.util.find_spec("paddleocr") is not None
+if not ocr_available:
     print("PaddleOCR not available. Using fallback mode.")
 
 
-class ReceiptItem(BaseModel):
-    name: str
-    price: float
-    quantity: int
+class UnknownOcrProfileError(ValueError):
+    pass
+
+
+def resolve_profile(profile: Optional[str]) -> str:
+    profile = profile or settings.ocr_default_profile
+    if profile not in OCR_PROFILES:
+        raise UnknownOcrProfileError(profile)
+    return profile
+
+
+def loaded_profiles() -> list[str]:
+    # The profiles every worker loads up front; others load on first use
+    profiles = [resolve_profile(None)]
+    if settings.ocr_fallback_queue_depth > 0 and FALLBACK_PROFILE not in profiles:
+        profiles.append(FALLBACK_PROFILE)
+    return profiles
+
 
+def get_ocr(profile: Optional[str] = None) -> Optional[OcrBackend]:
+    profile = resolve_profile(profile)
+    if profile not in ocr_instances and ocr_available:
+        if settings.ocr_backend == "onnx":
+            threads = settings.ocr_onnx_threads or settings.ocr_worker_threads
+        else:
+            threads = settings.ocr_worker_threads
+        ocr_instances[profile] = create_backend(
+            settings.ocr_backend,
+            OCR_PROFILES[profile],
+            threads,
+            settings.ocr_onnx_model_dir,
+        )
+    return ocr_instances.get(profile)
 
-class ParsedReceipt(BaseModel):
-    items: list[ReceiptItem]
-    total: float
 
+def _init_ocr_worker(threads: int) -> None:
+    # Runs once per pool process: the model is loaded per worker, not per
+    # request. Forked workers of a preloaded parent already have it.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    for profile in loaded_profiles():
+        get_ocr(profile)
 
-def get_ocr():
-    global ocr_instance
-    if ocr_instance is None and ocr_available:
-        # Minimal initialization for compatibility
-        ocr_instance = PaddleOCR(lang="vi", use_angle_cls=True)
-    return ocr_instance
+
+def preload_ocr() -> None:
+    # Load the model before worker processes are forked so they share its
+    # pages copy-on-write. gc.freeze() keeps the collector from touching (and
+    # so copying) every preloaded object in each child.
+    for profile in loaded_profiles():
+        get_ocr(profile)
+    gc.freeze()
+
+
+def _warmup_worker(profiles: list[str]) -> None:
+    import cv2
+    import numpy as np
+
+    image = np.full((320, 480, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "Tra da 5.000", (20, 160), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    _, encoded = cv2.imencode(".jpg", image)
+    for profile in profiles:
+        _extract_text_batch([encoded.tobytes()], get_preprocess_options(), profile)
+
+
+async def warmup_ocr(profiles: Optional[list[str]] = None) -> None:
+    if not ocr_available:
+        return
+    # One task per worker so every process starts and runs its first inference
+    loop = asyncio.get_running_loop()
+    pool = get_ocr_pool()
+    profiles = profiles or loaded_profiles()
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, _warmup_worker, profiles)
+            for _ in range(settings.ocr_workers)
+        )
+    )
 
 
-def parse_vnd_amount(amount_str: str) -> float:
-    cleaned = re.sub(r"[^\d]", "", amount_str)
-    if cleaned:
-        return float(cleaned)
-    return 0.0
+def get_ocr_pool() -> ProcessPoolExecutor:
+    global ocr_pool
+    if ocr_pool is None:
+        ocr_pool = ProcessPoolExecutor(
+            max_workers=settings.ocr_workers,
+            mp_context=multiprocessing.get_context(settings.ocr_start_method),
+            initializer=_init_ocr_worker,
+            initargs=(settings.ocr_worker_threads,),
+        )
+    return ocr_pool
 
 
-def extract_text_from_image(image_path: str) -> list[str]:
-    ocr = get_ocr()
+def discard_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    # A worker died (most likely OOM-killed on a large photo) and the executor
+    # now refuses all work. Drop it so the next batch starts a fresh pool,
+    # unless another batch already replaced it.
+    global ocr_pool
+    if ocr_pool is pool:
+        ocr_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        metrics.incr("ocr.pool_restarts")
+
+
+def shutdown_ocr_pool() -> None:
+    global ocr_pool
+    for batcher in ocr_batchers.values():
+        batcher.close()
+    ocr_batchers.clear()
+    if ocr_pool is not None:
+        ocr_pool.shutdown(wait=False, cancel_futures=True)
+        ocr_pool = None
+
+
+def extract_text_from_image(image_path: str, profile: Optional[str] = None) -> list[str]:
+    with open(image_path, "rb") as f:
+        return _extract_text_batch([f.read()], get_preprocess_options(), profile)[0]
+
+
+def get_preprocess_options() -> PreprocessOptions:
+    return PreprocessOptions(
+        exif_rotate=settings.ocr_exif_rotate,
+        max_side=settings.ocr_max_side,
+        crop_receipt=settings.ocr_crop_receipt,
+        grayscale=settings.ocr_grayscale,
+    )
+
+
+def _extract_text_batch(
+    images: list[bytes], options: PreprocessOptions, profile: Optional[str] = None
+) -> list[list[str]]:
+    # Detection has to run per image, but the text crops of the whole batch go
+    # through the classifier and recognizer together so their batches fill up
+    lines = [[] for _ in images]
+    ocr = get_ocr(profile)
     if not ocr:
-        return []
-    
-    result = ocr.ocr(image_path, cls=True)
+        return lines
 
-    if not result or not result[0]:
-        return []
+    crops = []
+    owners = []
+    for index, image_data in enumerate(images):
+        try:
+            image = preprocess_image(image_data, options)
+        except Exception as e:
+            print(f"Could not decode receipt image: {e}")
+            continue
+        for box in ocr.detect(image):
+            crops.append(ocr.crop(image, box))
+            owners.append(index)
 
-    lines = []
-    for line in result[0]:
-        if line and len(line) >= 2:
-            text = line[1][0]
-            lines.append(text)
+    if not crops:
+        return lines
+
+    for owner, (text, score) in zip(owners, ocr.recognize(crops)):
+        if score >= ocr.drop_score:
+            lines[owner].append(text)
     return lines
 
 
-def parse_receipt_text(lines: list[str]) -> ParsedReceipt:
-    items = []
-    total = 0.0
-
-    for line in lines:
-        line_lower = line.lower()
-
-        item_patterns = [
-            r"(.+?)\s*[x×]\s*(\d+)\s*[:\s=]*([0-9.,]+)",
-            r"(.+?)\s+(\d+)\s*[x×]\s*([0-9.,]+)",
-            r"(\d+)\s*[x×]\s*(.+?)\s*[:\s=]*([0-9.,]+)",
-        ]
-
-        matched = False
-        for pattern in item_patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                groups = match.groups()
-                if pattern == item_patterns[2]:
-                    quantity = int(groups[0])
-                    name = groups[1].strip()
-                    price = parse_vnd_amount(groups[2])
-                else:
-                    name = groups[0].strip()
-                    quantity = int(groups[1])
-                    price = parse_vnd_amount(groups[2])
-
-                if name and quantity > 0 and price > 0:
-                    items.append(ReceiptItem(name=name, price=price, quantity=quantity))
-                    matched = True
+class OcrBatcher:
+    def __init__(self, max_batch_size: int, max_wait_ms: float, profile: Optional[str] = None):
+        self.profile = profile
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms / 1000)
+        self.pending = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._collector: Optional[asyncio.Task] = None
+
+    async def submit(self, image_data: bytes) -> list[str]:
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        enqueued = loop.time()
+        self.pending += 1
+        metrics.set_gauge("ocr.queue_depth", ocr_queue_depth())
+        try:
+            await self._queue.put((image_data, future, enqueued))
+            return await future
+        finally:
+            self.pending -= 1
+            metrics.set_gauge("ocr.queue_depth", ocr_queue_depth())
+            metrics.observe("ocr.latency", loop.time() - enqueued)
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            idle = settings.ocr_workers - len(running_batches)
+            if idle > 0:
+                # A worker is free, so waiting only adds latency. Split what
+                # is queued now over the idle workers instead of giving it
+                # all to one of them.
+                limit = min(self.max_batch_size, math.ceil((1 + self._queue.qsize()) / idle))
+                while len(batch) < limit:
+                    batch.append(self._queue.get_nowait())
+                self._dispatch(batch)
+                continue
+
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
                     break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list[tuple[bytes, asyncio.Future, float]]) -> None:
+        task = asyncio.create_task(self._run_batch(batch))
+        running_batches.add(task)
+        task.add_done_callback(running_batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[bytes, asyncio.Future, float]]) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for _, _, enqueued in batch:
+            metrics.observe("ocr.queue_wait", now - enqueued)
+        pool = get_ocr_pool()
+        try:
+            results = await loop.run_in_executor(
+                pool,
+                _extract_text_batch,
+                [image for image, _, _ in batch],
+                get_preprocess_options(),
+                self.profile,
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                discard_ocr_pool(pool)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), lines in zip(batch, results):
+            if not future.done():
+                future.set_result(lines)
+
+    def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+
+
+def get_ocr_batcher(profile: Optional[str] = None) -> OcrBatcher:
+    # One batcher per profile: a batch runs on a single model instance
+    profile = resolve_profile(profile)
+    if profile not in ocr_batchers:
+        ocr_batchers[profile] = OcrBatcher(
+            settings.ocr_batch_size, settings.ocr_batch_wait_ms, profile
+        )
+    return ocr_batchers[profile]
+
+
+def ocr_queue_depth() -> int:
+    return sum(batcher.pending for batcher in ocr_batchers.values())
+
+
+class OcrBusyError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("OCR queue is full")
+        self.retry_after = retry_after
+
+
+class OcrAdmission:
+    # Bounds the scans in flight, overall and per user. Past the limit a
+    # request is turned away at once instead of queueing image buffers until
+    # the box swaps.
+    def __init__(self, max_queue: int, max_per_user: int, retry_after: int):
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.retry_after = retry_after
+        self.active = 0
+        self._per_user: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def admit(self, user_id: str):
+        if self.max_queue > 0 and self.active >= self.max_queue:
+            metrics.incr("ocr.rejected.queue_full")
+            raise OcrBusyError(self.retry_after)
+        if self.max_per_user > 0 and self._per_user.get(user_id, 0) >= self.max_per_user:
+            metrics.incr("ocr.rejected.user_limit")
+            raise OcrBusyError(self.retry_after)
 
-        if not matched:
-            simple_match = re.search(r"(.+?)\s+([0-9.,]+)\s*(đ|d|VND)?$", line)
-            if simple_match:
-                name = simple_match.group(1).strip()
-                price = parse_vnd_amount(simple_match.group(2))
-                if name and price >= 1000:
-                    skip_keywords = [
-                        "tổng",
-                        "total",
-                        "thành tiền",
-                        "thanh toán",
-                        "tiền thừa",
-                        "tiền nhận",
-                        "vat",
-                        "thuế",
-                    ]
-                    if not any(kw in name.lower() for kw in skip_keywords):
-                        items.append(ReceiptItem(name=name, price=price, quantity=1))
-
-        total_keywords = ["tổng cộng", "tổng tiền", "total", "thành tiền", "thanh toán"]
-        if any(kw in line_lower for kw in total_keywords):
-            total_match = re.search(r"([0-9.,]+)", line)
-            if total_match:
-                potential_total = parse_vnd_amount(total_match.group(1))
-                if potential_total > total:
-                    total = potential_total
-
-    if total == 0 and items:
-        total = sum(item.price * item.quantity for item in items)
-
-    return ParsedReceipt(items=items, total=total)
+        self.active += 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        metrics.set_gauge("ocr.admitted", self.active)
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._per_user[user_id] -= 1
+            if not self._per_user[user_id]:
+                del self._per_user[user_id]
+            metrics.set_gauge("ocr.admitted", self.active)
+
+
+ocr_admission = OcrAdmission(
+    settings.ocr_max_queue, settings.ocr_max_per_user, settings.ocr_retry_after_seconds
+)
+
+
+def choose_profile(profile: str) -> str:
+    # Under load, trade accuracy for latency instead of letting the queue grow
+    limit = settings.ocr_fallback_queue_depth
+    if limit > 0 and profile != FALLBACK_PROFILE and ocr_queue_depth() >= limit:
+        metrics.incr("ocr.profile_fallbacks")
+        return FALLBACK_PROFILE
+    return profile
+
+
+def profile_cache_key(image_hash: str, profile: str) -> str:
+    # Results of the original profile keep the bare hash so rows stored before
+    # profiles existed are still found
+    return image_hash if profile == "accurate" else f"{image_hash}:{profile}"
 
 
 def generate_mock_receipt() -> ParsedReceipt:
@@ -143,33 +381,43 @@ def generate_mock_receipt() -> ParsedReceipt:
     
     total = sum(item.price * item.quantity for item in selected)
     
-    return ParsedReceipt(items=selected, total=total)
+    return ParsedReceipt(items=selected, total=total, mock=True)
+
 
+def decode_image_base64(image_base64: str) -> bytes:
+    # Skip a data URL prefix through a memoryview instead of copying the payload
+    start = image_base64.find(",", 0, 100) + 1
+    return binascii.a2b_base64(memoryview(image_base64.encode("ascii"))[start:])
 
-async def parse_receipt_image(image_base64: str) -> ParsedReceipt:
+
+async def parse_receipt_image(
+    image_data: bytes,
+    image_hash: Optional[str] = None,
+    use_cache: bool = True,
+    profile: Optional[str] = None,
+) -> ParsedReceipt:
+    profile = resolve_profile(profile)
     if not ocr_available:
         print("PaddleOCR not available, using mock data")
         return generate_mock_receipt()
-    
-    if "," in image_base64:
-        image_base64 = image_base64.split(",")[1]
-
-    image_data = base64.b64decode(image_base64)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-        tmp_file.write(image_data)
-        tmp_path = tmp_file.name
-
-    try:
-        lines = extract_text_from_image(tmp_path)
-        if not lines:
-            print("No text extracted, using mock data")
-            return generate_mock_receipt()
-        result = parse_receipt_text(lines)
-        if not result.items:
-            print("No items parsed, using mock data")
-            return generate_mock_receipt()
-        return result
-    finally:
-        if os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+
+    image_hash = image_hash or hash_image(image_data)
+    if use_cache:
+        cached = await receipt_cache.get(profile_cache_key(image_hash, profile))
+        if cached is not None:
+            return ParsedReceipt.model_validate({**cached, "profile": profile})
+
+    profile = choose_profile(profile)
+    metrics.incr(f"ocr.profile.{profile}")
+    lines = await get_ocr_batcher(profile).submit(image_data)
+    if not lines:
+        print("No text extracted, using mock data")
+        return generate_mock_receipt()
+    result = parse_receipt_text(lines)
+    if not result.items:
+        print("No items parsed, using mock data")
+        return generate_mock_receipt()
+
+    result.profile = profile
+    receipt_cache.put(profile_cache_key(image_hash, profile), result.model_dump())
+    return result
@@ -0,0 +1,157 @@
+import asyncio
+from typing import Optional
+
+import httpx
+from pydantic import BaseModel
+
+from config import get_settings
+from services import metrics
+from services.http_retry import send_with_retry
+
+settings = get_settings()
+
+# Expo's limits per request
+MAX_MESSAGES = 100
+MAX_RECEIPT_IDS = 1000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+client: Optional["ExpoPushClient"] = None
+
+
+class PushTicket(BaseModel):
+    status: str
+    id: Optional[str] = None
+    message: str = ""
+    error: Optional[str] = None
+
+    def is_success(self) -> bool:
+        return self.status == "ok"
+
+
+class PushReceipt(BaseModel):
+    status: str
+    message: str = ""
+    error: Optional[str] = None
+
+    def is_success(self) -> bool:
+        return self.status == "ok"
+
+
+class ExpoPushClient:
+    # Async client for the Expo push API over one pooled httpx client.
+    # Sends are split into chunks of MAX_MESSAGES that go out concurrently,
+    # at most max_concurrency at a time.
+    def __init__(
+        self,
+        host: str,
+        access_token: str = "",
+        max_connections: int = 10,
+        max_concurrency: int = 4,
+        timeout: float = 30,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+    ):
+        self.base_url = f"{host.rstrip('/')}/--/api/v2/push"
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+        self._http = httpx.AsyncClient(
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+
+    async def _post(self, action: str, payload) -> dict:
+        response = await send_with_retry(
+            self._http,
+            lambda: self._http.build_request("POST", f"{self.base_url}/{action}", json=payload),
+            self.max_retries + 1,
+            self.retry_backoff,
+            semaphore=self._semaphore,
+            retry_statuses=RETRY_STATUSES,
+        )
+        body = response.json()
+        if "errors" in body:
+            raise ValueError(f"Expo {action} failed: {body['errors']}")
+        return body
+
+    async def _send_chunk(self, messages: list[dict]) -> list[PushTicket]:
+        metrics.incr("push.requests")
+        metrics.incr("push.messages", len(messages))
+        try:
+            tickets = (await self._post("send", messages)).get("data", [])
+            if len(tickets) != len(messages):
+                raise ValueError(f"Expo returned {len(tickets)} tickets for {len(messages)} messages")
+        except Exception as e:
+            # The whole chunk failed; every message gets an error ticket with
+            # no error code, which callers treat as retryable
+            return [PushTicket(status="error", message=str(e)) for _ in messages]
+
+        return [
+            PushTicket(
+                status=ticket.get("status", "error"),
+                id=ticket.get("id"),
+                message=ticket.get("message", ""),
+                error=(ticket.get("details") or {}).get("error"),
+            )
+            for ticket in tickets
+        ]
+
+    async def send(self, messages: list[dict]) -> list[PushTicket]:
+        """Send messages ({"to", "title", "body", "data"}); one ticket per message, in order."""
+        messages = [{k: v for k, v in message.items() if v is not None} for message in messages]
+        chunks = [messages[i : i + MAX_MESSAGES] for i in range(0, len(messages), MAX_MESSAGES)]
+        results = await asyncio.gather(*(self._send_chunk(chunk) for chunk in chunks))
+        return [ticket for tickets in results for ticket in tickets]
+
+    async def _receipts_chunk(self, ticket_ids: list[str]) -> dict[str, PushReceipt]:
+        body = await self._post("getReceipts", {"ids": ticket_ids})
+        return {
+            ticket_id: PushReceipt(
+                status=receipt.get("status", "error"),
+                message=receipt.get("message", ""),
+                error=(receipt.get("details") or {}).get("error"),
+            )
+            for ticket_id, receipt in body.get("data", {}).items()
+        }
+
+    async def get_receipts(self, ticket_ids: list[str]) -> dict[str, PushReceipt]:
+        """Delivery receipts by ticket id. Ids Expo has no receipt for yet are left out."""
+        chunks = [
+            ticket_ids[i : i + MAX_RECEIPT_IDS] for i in range(0, len(ticket_ids), MAX_RECEIPT_IDS)
+        ]
+        receipts: dict[str, PushReceipt] = {}
+        for result in await asyncio.gather(*(self._receipts_chunk(chunk) for chunk in chunks)):
+            receipts.update(result)
+        return receipts
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+def get_client() -> ExpoPushClient:
+    global client
+    if client is None:
+        client = ExpoPushClient(
+            settings.expo_push_host,
+            settings.expo_access_token,
+            max_connections=settings.expo_push_max_connections,
+            max_concurrency=settings.expo_push_max_concurrency,
+            timeout=settings.expo_push_timeout,
+            max_retries=settings.expo_push_max_retries,
+            retry_backoff=settings.expo_push_retry_backoff,
+        )
+    return client
+
+
+async def close_client() -> None:
+    global client
+    if client is not None:
+        await client.close()
+        client = None
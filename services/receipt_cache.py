@@ -0,0 +1,54 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from config import get_settings
+from services import metrics
+
+settings = get_settings()
+
+
+def hash_image(image_data: bytes) -> str:
+    return hashlib.sha256(image_data).hexdigest()
+
+
+class ReceiptCache:
+    # Two tiers: a bounded in-process LRU, then Receipt.parsedData rows that
+    # were stored for the same image hash by an earlier scan
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+
+    async def get(self, image_hash: str) -> Optional[dict]:
+        parsed = self._entries.get(image_hash)
+        if parsed is not None:
+            self._entries.move_to_end(image_hash)
+            metrics.incr("receipt_cache.memory_hits")
+            return parsed
+
+        # Imported here so the OCR pool workers, which import this module
+        # through ocr_service, never load the Prisma client
+        from database import db
+
+        receipt = await db.receipt.find_first(
+            where={"imageHash": image_hash},
+            order={"createdAt": "desc"},
+        )
+        if receipt and receipt.parsedData:
+            metrics.incr("receipt_cache.db_hits")
+            self.put(image_hash, receipt.parsedData)
+            return receipt.parsedData
+
+        metrics.incr("receipt_cache.misses")
+        return None
+
+    def put(self, image_hash: str, parsed: dict) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[image_hash] = parsed
+        self._entries.move_to_end(image_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+receipt_cache = ReceiptCache(settings.receipt_cache_size)
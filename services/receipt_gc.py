@@ -0,0 +1,195 @@
+"""Delete receipts no expense uses any more, together with their images.
+
+    python -m services.receipt_gc [--dry-run] [--grace-hours 24] [--limit N]
+
+Receipts lose their last expense when it is edited or deleted, or when its
+group is deleted. The API also runs this every RECEIPT_GC_INTERVAL seconds.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from config import get_settings
+from database import connect_db, db, disconnect_db
+from services import metrics
+from services.storage_service import ImageStore, close_image_store, get_image_store
+
+settings = get_settings()
+
+gc_task: Optional[asyncio.Task] = None
+
+ORPHAN_WHERE = """
+    r."updatedAt" < NOW() - make_interval(hours => $1::int)
+    AND NOT EXISTS (SELECT 1 FROM "Expense" e WHERE e."receiptId" = r."id")
+"""
+
+SELECT_ORPHANS = f"""
+SELECT r."id", r."publicId", r."displayPublicId", r."thumbnailPublicId"
+FROM "Receipt" r
+WHERE {ORPHAN_WHERE} AND r."id" > $2
+ORDER BY r."id"
+LIMIT $3
+"""
+
+# The orphan check is repeated on the locked rows, so an expense created
+# since the SELECT keeps its receipt. SKIP LOCKED lets several API processes
+# collect at once without waiting on each other.
+DELETE_ORPHANS = f"""
+DELETE FROM "Receipt" d
+WHERE d."id" IN (
+    SELECT r."id" FROM "Receipt" r
+    WHERE {ORPHAN_WHERE}
+    ORDER BY r."id"
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+)
+AND NOT EXISTS (SELECT 1 FROM "Expense" e WHERE e."receiptId" = d."id")
+RETURNING d."id", d."publicId", d."displayPublicId", d."thumbnailPublicId"
+"""
+
+
+class GcReport(BaseModel):
+    dry_run: bool
+    receipts: int = 0
+    images: int = 0
+    image_failures: int = 0
+    seconds: float = 0
+    receipts_per_second: float = 0
+    images_per_second: float = 0
+
+
+class RateLimiter:
+    # Spaces calls evenly; Cloudinary's Admin API allows a few hundred
+    # calls per hour
+    def __init__(self, calls_per_minute: float):
+        self.interval = 60 / calls_per_minute if calls_per_minute > 0 else 0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        delay = self._next - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next = max(loop.time(), self._next) + self.interval
+
+
+def image_ids(rows: list[dict]) -> list[str]:
+    return [
+        row[column]
+        for row in rows
+        for column in ("publicId", "displayPublicId", "thumbnailPublicId")
+        if row.get(column)
+    ]
+
+
+async def delete_images(
+    store: ImageStore, public_ids: list[str], batch_size: int, limiter: RateLimiter
+) -> int:
+    failures = 0
+    for start in range(0, len(public_ids), batch_size):
+        batch = public_ids[start : start + batch_size]
+        await limiter.wait()
+        try:
+            await store.delete_many(batch)
+        except Exception as e:
+            # The rows are gone already; log the ids so they can be removed by hand
+            print(f"Receipt GC image delete error: {e}; public ids: {batch}")
+            failures += len(batch)
+    return failures
+
+
+async def collect_orphan_receipts(
+    dry_run: bool = False,
+    grace_hours: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> GcReport:
+    grace_hours = settings.receipt_gc_grace_hours if grace_hours is None else grace_hours
+    batch_size = batch_size or settings.receipt_gc_batch_size
+    store = get_image_store()
+    limiter = RateLimiter(settings.receipt_gc_max_calls_per_minute)
+    report = GcReport(dry_run=dry_run)
+    start = time.perf_counter()
+
+    last_id = ""
+    while limit is None or report.receipts < limit:
+        take = batch_size if limit is None else min(batch_size, limit - report.receipts)
+        if dry_run:
+            rows = await db.query_raw(SELECT_ORPHANS, grace_hours, last_id, take)
+        else:
+            # Rows first: an image whose row is gone can leak, but no expense
+            # is ever left pointing at a deleted image
+            rows = await db.query_raw(DELETE_ORPHANS, grace_hours, take)
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        public_ids = image_ids(rows)
+        report.receipts += len(rows)
+        report.images += len(public_ids)
+        if not dry_run:
+            report.image_failures += await delete_images(store, public_ids, batch_size, limiter)
+
+    report.seconds = round(time.perf_counter() - start, 3)
+    if report.seconds:
+        report.receipts_per_second = round(report.receipts / report.seconds, 1)
+        report.images_per_second = round(report.images / report.seconds, 1)
+
+    if not dry_run:
+        metrics.incr("receipt_gc.receipts", report.receipts)
+        metrics.incr("receipt_gc.images", report.images - report.image_failures)
+        metrics.incr("receipt_gc.image_failures", report.image_failures)
+        metrics.observe("receipt_gc.run", report.seconds)
+    return report
+
+
+async def _gc_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.receipt_gc_interval)
+        try:
+            report = await collect_orphan_receipts()
+            if report.receipts:
+                print(f"Receipt GC: {report.model_dump()}")
+        except Exception as e:
+            print(f"Receipt GC error: {e}")
+
+
+async def start_receipt_gc() -> None:
+    global gc_task
+    if settings.receipt_gc_interval > 0:
+        gc_task = asyncio.create_task(_gc_loop())
+
+
+async def stop_receipt_gc() -> None:
+    global gc_task
+    if gc_task is not None:
+        gc_task.cancel()
+        await asyncio.gather(gc_task, return_exceptions=True)
+        gc_task = None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--grace-hours", type=int)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    await connect_db()
+    try:
+        report = await collect_orphan_receipts(
+            args.dry_run, args.grace_hours, args.batch_size, args.limit
+        )
+    finally:
+        await close_image_store()
+        await disconnect_db()
+    print(json.dumps(report.model_dump(), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
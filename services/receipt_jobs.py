@@ -0,0 +1,248 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config import get_settings
+from database import db
+from services.ocr_service import decode_image_base64
+from services.receipt_service import process_receipt
+
+settings = get_settings()
+
+job_queue: Optional["JobQueue"] = None
+job_workers: list[asyncio.Task] = []
+
+PRUNE_INTERVAL = 3600
+
+
+class JobQueue(ABC):
+    # Jobs always live in the ReceiptJob table; a queue only decides how
+    # workers find out which job to run next
+
+    @abstractmethod
+    async def put(self, job_id: str) -> None: ...
+
+    @abstractmethod
+    async def get(self) -> str:
+        """Wait for the next job and return its id with the job marked running."""
+
+    @abstractmethod
+    async def recover(self) -> None:
+        """Make jobs interrupted by a restart runnable again."""
+
+    async def renew_lease(self, job_id: str) -> None:
+        """Keep a running job claimed until cancelled; only needed when other processes reclaim jobs."""
+
+
+class LocalJobQueue(JobQueue):
+    def __init__(self):
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+
+    async def put(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    async def get(self) -> str:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                claimed = await db.receiptjob.update_many(
+                    where={"id": job_id, "status": "pending"},
+                    data={"status": "running", "attempts": {"increment": 1}},
+                )
+            except Exception:
+                # Keep the job queued for the next attempt
+                self._queue.put_nowait(job_id)
+                raise
+            if claimed:
+                return job_id
+
+    async def recover(self) -> None:
+        await db.receiptjob.update_many(
+            where={"status": "running"}, data={"status": "pending"}
+        )
+        jobs = await db.receiptjob.find_many(
+            where={"status": "pending"}, order={"createdAt": "asc"}
+        )
+        for job in jobs:
+            await self.put(job.id)
+
+
+class DatabaseJobQueue(JobQueue):
+    def __init__(self, poll_interval: float, lease_seconds: int):
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+
+    async def put(self, job_id: str) -> None:
+        self._wakeup.set()
+
+    async def get(self) -> str:
+        while True:
+            # SKIP LOCKED lets every API worker poll the same table without
+            # two of them claiming one job. Running jobs whose lease ran out
+            # were interrupted (their worker renews the lease while it runs)
+            # and are claimed again.
+            rows = await db.query_raw(
+                """
+                UPDATE "ReceiptJob"
+                SET "status" = 'running', "attempts" = "attempts" + 1, "updatedAt" = NOW()
+                WHERE "id" = (
+                    SELECT "id" FROM "ReceiptJob"
+                    WHERE "status" = 'pending'
+                       OR ("status" = 'running'
+                           AND "updatedAt" < NOW() - make_interval(secs => $1::int))
+                    ORDER BY "createdAt"
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING "id"
+                """,
+                self.lease_seconds,
+            )
+            if rows:
+                return rows[0]["id"]
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def recover(self) -> None:
+        # Other API workers may still be running their jobs, so only take
+        # back the ones whose lease ran out
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)
+        await db.receiptjob.update_many(
+            where={"status": "running", "updatedAt": {"lt": stale_before}},
+            data={"status": "pending"},
+        )
+
+    async def renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await db.receiptjob.update_many(
+                    where={"id": job_id, "status": "running"},
+                    data={"updatedAt": datetime.now(timezone.utc)},
+                )
+            except Exception as e:
+                print(f"Could not renew the lease of receipt job {job_id}: {e}")
+
+
+def get_job_queue() -> JobQueue:
+    global job_queue
+    if job_queue is None:
+        if settings.receipt_job_queue == "local":
+            job_queue = LocalJobQueue()
+        else:
+            job_queue = DatabaseJobQueue(
+                settings.receipt_job_poll_interval, settings.receipt_job_lease_seconds
+            )
+    return job_queue
+
+
+async def create_job(image_base64: str, user_id: str, profile: Optional[str] = None):
+    job = await db.receiptjob.create(
+        data={"imageBase64": image_base64, "userId": user_id, "profile": profile}
+    )
+    await get_job_queue().put(job.id)
+    return job
+
+
+async def run_job(job_id: str) -> None:
+    job = await db.receiptjob.find_unique(where={"id": job_id})
+    if not job or job.status != "running":
+        return
+    if job.attempts > settings.receipt_job_max_attempts:
+        # Reclaimed after its worker died too many times, e.g. an image that
+        # crashes OCR every time
+        await db.receiptjob.update(
+            where={"id": job_id},
+            data={"status": "failed", "error": "Interrupted too many times", "imageBase64": None},
+        )
+        return
+
+    try:
+        response = await process_receipt(
+            decode_image_base64(job.imageBase64), job.userId, job.profile
+        )
+    except Exception as e:
+        print(f"Receipt job {job_id} failed: {e}")
+        if job.attempts >= settings.receipt_job_max_attempts:
+            await db.receiptjob.update(
+                where={"id": job_id},
+                data={"status": "failed", "error": str(e), "imageBase64": None},
+            )
+        else:
+            await db.receiptjob.update(
+                where={"id": job_id}, data={"status": "pending", "error": str(e)}
+            )
+            await get_job_queue().put(job_id)
+        return
+
+    await db.receiptjob.update(
+        where={"id": job_id},
+        data={
+            "status": "done",
+            "result": response.model_dump(),
+            "error": None,
+            "imageBase64": None,
+        },
+    )
+
+
+async def _job_worker(queue: JobQueue) -> None:
+    while True:
+        try:
+            job_id = await queue.get()
+        except Exception as e:
+            print(f"Receipt job queue error: {e}")
+            await asyncio.sleep(settings.receipt_job_poll_interval)
+            continue
+
+        lease = asyncio.create_task(queue.renew_lease(job_id))
+        try:
+            await run_job(job_id)
+        except Exception as e:
+            print(f"Receipt job worker error: {e}")
+        finally:
+            lease.cancel()
+
+
+async def prune_finished_jobs() -> int:
+    # Clients poll a job for as long as a scan takes; after the retention
+    # window nobody reads it again
+    finished_before = datetime.now(timezone.utc) - timedelta(
+        hours=settings.receipt_job_retention_hours
+    )
+    return await db.receiptjob.delete_many(
+        where={"status": {"in": ["done", "failed"]}, "updatedAt": {"lt": finished_before}}
+    )
+
+
+async def _prune_loop() -> None:
+    while True:
+        try:
+            pruned = await prune_finished_jobs()
+            if pruned:
+                print(f"Pruned {pruned} finished receipt jobs")
+        except Exception as e:
+            print(f"Receipt job prune error: {e}")
+        await asyncio.sleep(PRUNE_INTERVAL)
+
+
+async def start_job_workers() -> None:
+    queue = get_job_queue()
+    await queue.recover()
+    for _ in range(settings.receipt_job_workers):
+        job_workers.append(asyncio.create_task(_job_worker(queue)))
+    if settings.receipt_job_retention_hours > 0:
+        job_workers.append(asyncio.create_task(_prune_loop()))
+
+
+async def stop_job_workers() -> None:
+    for task in job_workers:
+        task.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    job_workers.clear()
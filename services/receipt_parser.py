@@ -0,0 +1,123 @@
+import re
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ReceiptItem(BaseModel):
+    name: str
+    price: float
+    quantity: int
+
+
+class ParsedReceipt(BaseModel):
+    items: list[ReceiptItem]
+    total: float
+    mock: bool = False
+    profile: Optional[str] = None
+
+
+def keyword_matcher(keywords: list[str]) -> re.Pattern:
+    # One alternation scans the line once instead of one `in` per keyword
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+# (pattern, quantity comes before the name)
+ITEM_PATTERNS = [
+    (re.compile(r"(.+?)\s*[x×]\s*(\d+)\s*[:\s=]*([0-9.,]+)", re.IGNORECASE), False),
+    (re.compile(r"(.+?)\s+(\d+)\s*[x×]\s*([0-9.,]+)", re.IGNORECASE), False),
+    (re.compile(r"(\d+)\s*[x×]\s*(.+?)\s*[:\s=]*([0-9.,]+)", re.IGNORECASE), True),
+]
+SIMPLE_ITEM_PATTERN = re.compile(r"(.+?)\s+([0-9.,]+)\s*(đ|d|VND)?$")
+AMOUNT_PATTERN = re.compile(r"([0-9.,]+)")
+NON_DIGIT_PATTERN = re.compile(r"[^\d]")
+
+# Characters a line can end with (after trailing whitespace) if
+# SIMPLE_ITEM_PATTERN is to match it
+SIMPLE_ITEM_ENDINGS = frozenset("0123456789.,đdD")
+
+SKIP_KEYWORDS = keyword_matcher(
+    [
+        "tổng",
+        "total",
+        "thành tiền",
+        "thanh toán",
+        "tiền thừa",
+        "tiền nhận",
+        "vat",
+        "thuế",
+    ]
+)
+TOTAL_KEYWORDS = keyword_matcher(
+    ["tổng cộng", "tổng tiền", "total", "thành tiền", "thanh toán"]
+)
+
+
+def parse_vnd_amount(amount_str: str) -> float:
+    cleaned = NON_DIGIT_PATTERN.sub("", amount_str)
+    if cleaned:
+        return float(cleaned)
+    return 0.0
+
+
+def match_quantity_item(line: str):
+    for pattern, quantity_first in ITEM_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        groups = match.groups()
+        if quantity_first:
+            quantity = int(groups[0])
+            name = groups[1].strip()
+        else:
+            name = groups[0].strip()
+            quantity = int(groups[1])
+        price = parse_vnd_amount(groups[2])
+
+        if name and quantity > 0 and price > 0:
+            return ReceiptItem(name=name, price=price, quantity=quantity)
+    return None
+
+
+def match_simple_item(line: str):
+    stripped = line.rstrip()
+    if not stripped or stripped[-1] not in SIMPLE_ITEM_ENDINGS:
+        return None
+
+    match = SIMPLE_ITEM_PATTERN.search(line)
+    if not match:
+        return None
+    name = match.group(1).strip()
+    price = parse_vnd_amount(match.group(2))
+    if name and price >= 1000 and not SKIP_KEYWORDS.search(name.lower()):
+        return ReceiptItem(name=name, price=price, quantity=1)
+    return None
+
+
+def parse_receipt_text(lines: list[str]) -> ParsedReceipt:
+    items = []
+    total = 0.0
+
+    for line in lines:
+        line_lower = line.lower()
+
+        # Every quantity pattern needs an "x"/"×" marker; most lines have none
+        item = None
+        if "x" in line_lower or "×" in line:
+            item = match_quantity_item(line)
+        if item is None:
+            item = match_simple_item(line)
+        if item is not None:
+            items.append(item)
+
+        if TOTAL_KEYWORDS.search(line_lower):
+            total_match = AMOUNT_PATTERN.search(line)
+            if total_match:
+                potential_total = parse_vnd_amount(total_match.group(1))
+                if potential_total > total:
+                    total = potential_total
+
+    if total == 0 and items:
+        total = sum(item.price * item.quantity for item in items)
+
+    return ParsedReceipt(items=items, total=total)
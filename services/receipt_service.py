@@ -0,0 +1,178 @@
+import asyncio
+from typing import Optional
+
+from prisma.errors import UniqueViolationError
+
+from config import get_settings
+from database import db
+from models.schemas import ReceiptParseResponse, ReceiptItem
+from services import metrics
+from services.image_renditions import ReceiptImageUploads, upload_receipt_images
+from services.ocr_service import ParsedReceipt, parse_receipt_image, profile_cache_key
+from services.receipt_cache import hash_image
+from services.staged_uploads import get_staged_uploads
+from services.storage_service import get_image_store
+
+settings = get_settings()
+
+
+async def run_receipt_pipeline(
+    image_data: bytes,
+    image_hash: str,
+    profile: Optional[str] = None,
+    upload: bool = True,
+) -> tuple[Optional[ReceiptImageUploads], ParsedReceipt]:
+    store = get_image_store()
+    upload_result, parsed_data = await asyncio.gather(
+        upload_receipt_images(store, image_data) if upload else asyncio.sleep(0),
+        parse_receipt_image(image_data, image_hash, profile=profile),
+        return_exceptions=True,
+    )
+
+    if isinstance(parsed_data, BaseException):
+        if upload_result is not None and not isinstance(upload_result, BaseException):
+            # Nothing will reference the image, don't leave it in the store
+            await discard_upload(upload_result)
+        raise parsed_data
+
+    if isinstance(upload_result, BaseException):
+        # Keep the OCR result; the receipt is saved without an image
+        print(f"Receipt upload error: {upload_result}")
+        upload_result = None
+
+    return upload_result, parsed_data
+
+
+async def discard_upload(upload_result: ReceiptImageUploads) -> None:
+    for public_id in upload_result.public_ids():
+        try:
+            await get_image_store().delete(public_id)
+        except Exception as e:
+            print(f"Receipt image cleanup error: {e}")
+
+
+def parsed_fields(parsed_data: ParsedReceipt, image_hash: str) -> dict:
+    return {
+        "parsedData": {
+            "items": [item.model_dump() for item in parsed_data.items],
+            "total": parsed_data.total,
+        },
+        # Mock data must never be served from the cache for this image
+        "imageHash": (
+            None
+            if parsed_data.mock
+            else profile_cache_key(image_hash, parsed_data.profile)
+        ),
+    }
+
+
+async def find_user_receipt(user_id: str, content_hash: str):
+    return await db.receipt.find_unique(
+        where={
+            "uploadedById_contentHash": {
+                "uploadedById": user_id,
+                "contentHash": content_hash,
+            }
+        }
+    )
+
+
+def uploads_inline() -> bool:
+    return settings.receipt_upload_mode != "background"
+
+
+async def stage_image(receipt, image_data: bytes) -> bool:
+    # Background mode: the image is uploaded after the response has gone out
+    if receipt.imageUrl:
+        return False
+    uploads = get_staged_uploads()
+    if uploads.is_staged(receipt.id):
+        return True
+    try:
+        await uploads.stage(receipt.id, image_data)
+        return True
+    except OSError as e:
+        print(f"Receipt image staging error: {e}")
+        return False
+
+
+def receipt_response(
+    receipt, parsed_data: ParsedReceipt, image_pending: bool = False
+) -> ReceiptParseResponse:
+    return ReceiptParseResponse(
+        receiptId=receipt.id,
+        imageUrl=receipt.imageUrl,
+        displayUrl=receipt.displayUrl,
+        thumbnailUrl=receipt.thumbnailUrl,
+        items=[
+            ReceiptItem(name=item.name, price=item.price, quantity=item.quantity)
+            for item in parsed_data.items
+        ],
+        total=parsed_data.total,
+        message=(
+            "Đã phân tích hóa đơn thành công!"
+            if receipt.imageUrl or image_pending
+            else "Đã phân tích hóa đơn, nhưng chưa lưu được ảnh"
+        ),
+    )
+
+
+async def reuse_receipt(
+    receipt, image_data: bytes, image_hash: str, profile: Optional[str]
+) -> ReceiptParseResponse:
+    # The user already sent these exact bytes. Only upload if the earlier
+    # upload failed; the parse is normally answered by the receipt cache.
+    upload_result, parsed_data = await run_receipt_pipeline(
+        image_data, image_hash, profile, upload=uploads_inline() and not receipt.imageUrl
+    )
+
+    data = parsed_fields(parsed_data, image_hash)
+    if upload_result:
+        data.update(upload_result.fields())
+    # Always written so updatedAt moves: the receipt GC must not collect a
+    # receipt it handed out again just before the expense that uses it lands
+    receipt = await db.receipt.update(where={"id": receipt.id}, data=data)
+    metrics.incr("receipt_dedup.reused")
+    image_pending = not uploads_inline() and await stage_image(receipt, image_data)
+    return receipt_response(receipt, parsed_data, image_pending)
+
+
+async def process_receipt(
+    image_data: bytes, user_id: str, profile: Optional[str] = None
+) -> ReceiptParseResponse:
+    image_hash = hash_image(image_data)
+
+    existing = await find_user_receipt(user_id, image_hash)
+    if existing:
+        return await reuse_receipt(existing, image_data, image_hash, profile)
+
+    upload_result, parsed_data = await run_receipt_pipeline(
+        image_data, image_hash, profile, upload=uploads_inline()
+    )
+
+    try:
+        receipt = await db.receipt.create(
+            data={
+                **(upload_result.fields() if upload_result else {}),
+                "contentHash": image_hash,
+                "uploadedById": user_id,
+                **parsed_fields(parsed_data, image_hash),
+            }
+        )
+    except UniqueViolationError:
+        # A concurrent request from the same user stored this image first
+        existing = await find_user_receipt(user_id, image_hash)
+        if not existing:
+            raise
+        if upload_result and not existing.imageUrl:
+            existing = await db.receipt.update(
+                where={"id": existing.id}, data=upload_result.fields()
+            )
+        elif upload_result:
+            await discard_upload(upload_result)
+        metrics.incr("receipt_dedup.reused")
+        image_pending = not uploads_inline() and await stage_image(existing, image_data)
+        return receipt_response(existing, parsed_data, image_pending)
+
+    image_pending = not uploads_inline() and await stage_image(receipt, image_data)
+    return receipt_response(receipt, parsed_data, image_pending)
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import random
+from pathlib import Path
+from typing import Optional
+
+from config import get_settings
+from database import db
+from services import metrics
+from services.image_renditions import upload_receipt_images
+from services.storage_service import get_image_store
+
+settings = get_settings()
+
+staged_uploads: Optional["StagedUploads"] = None
+upload_workers: list[asyncio.Task] = []
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class StagedUploads:
+    # Write-behind for receipt images. The request writes the photo to the
+    # staging directory as <receiptId>.jpg and returns; upload workers push it
+    # to the image store and fill in Receipt.imageUrl/publicId. A worker claims
+    # a file by renaming it to <receiptId>.<pid>.uploading, so several API
+    # processes can share one directory.
+    def __init__(self, root: str, max_attempts: int, retry_delay: float):
+        self.root = Path(root)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+        self._retries: set[asyncio.TimerHandle] = set()
+
+    def _staged_path(self, receipt_id: str) -> Path:
+        return self.root / f"{receipt_id}.jpg"
+
+    def _write(self, receipt_id: str, image_data: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name first so a crash never leaves a
+        # truncated image for recovery to upload
+        tmp_path = self.root / f"{receipt_id}.tmp"
+        tmp_path.write_bytes(image_data)
+        tmp_path.replace(self._staged_path(receipt_id))
+
+    def is_staged(self, receipt_id: str) -> bool:
+        return self._staged_path(receipt_id).exists() or any(
+            self.root.glob(f"{receipt_id}.*.uploading")
+        )
+
+    async def stage(self, receipt_id: str, image_data: bytes) -> None:
+        await asyncio.to_thread(self._write, receipt_id, image_data)
+        self._enqueue(receipt_id, 1)
+
+    def _enqueue(self, receipt_id: str, attempt: int) -> None:
+        self._queue.put_nowait((receipt_id, attempt))
+        metrics.set_gauge("staged_uploads.queued", self._queue.qsize())
+
+    def _retry_later(self, receipt_id: str, attempt: int) -> None:
+        delay = random.uniform(0, self.retry_delay * 2 ** (attempt - 1))
+        handle = asyncio.get_running_loop().call_later(
+            delay, lambda: (self._retries.discard(handle), self._enqueue(receipt_id, attempt))
+        )
+        self._retries.add(handle)
+
+    async def next(self) -> tuple[str, int]:
+        item = await self._queue.get()
+        metrics.set_gauge("staged_uploads.queued", self._queue.qsize())
+        return item
+
+    async def upload(self, receipt_id: str, attempt: int) -> None:
+        staged = self._staged_path(receipt_id)
+        claimed = self.root / f"{receipt_id}.{os.getpid()}.uploading"
+        try:
+            staged.rename(claimed)
+        except FileNotFoundError:
+            # Another worker has it, or it is already done
+            return
+
+        store = get_image_store()
+        try:
+            image_data = await asyncio.to_thread(claimed.read_bytes)
+            result = await upload_receipt_images(store, image_data)
+        except Exception as e:
+            self._release(receipt_id, attempt, e)
+            return
+
+        try:
+            updated = await db.receipt.update_many(
+                where={"id": receipt_id}, data=result.fields()
+            )
+        except Exception as e:
+            # Nothing references the uploaded images yet; delete them and
+            # retry the whole upload rather than leave them orphaned
+            await self._delete_images(store, result)
+            self._release(receipt_id, attempt, e)
+            return
+
+        if not updated:
+            # The receipt was deleted while its image was on the way up
+            await self._delete_images(store, result)
+        claimed.unlink(missing_ok=True)
+        metrics.incr("staged_uploads.done")
+
+    def _release(self, receipt_id: str, attempt: int, error: Exception) -> None:
+        # Hand the claimed file back to the staging directory
+        claimed = self.root / f"{receipt_id}.{os.getpid()}.uploading"
+        claimed.rename(self._staged_path(receipt_id))
+        if attempt >= self.max_attempts:
+            # Left staged; the next startup tries again
+            print(f"Staged upload of receipt {receipt_id} failed: {error}")
+            metrics.incr("staged_uploads.failed")
+        else:
+            metrics.incr("staged_uploads.retried")
+            self._retry_later(receipt_id, attempt + 1)
+
+    async def _delete_images(self, store, result) -> None:
+        for public_id in result.public_ids():
+            try:
+                await store.delete(public_id)
+            except Exception as e:
+                print(f"Receipt image cleanup error: {e}")
+
+    def recover(self) -> None:
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*.tmp"):
+            path.unlink(missing_ok=True)
+        for path in self.root.glob("*.uploading"):
+            receipt_id, pid, _ = path.name.split(".")
+            # Our own pid here is a leftover of an earlier run that reused it
+            if int(pid) == os.getpid() or not _process_alive(int(pid)):
+                try:
+                    path.rename(self._staged_path(receipt_id))
+                except FileNotFoundError:
+                    pass
+        for path in self.root.glob("*.jpg"):
+            self._enqueue(path.stem, 1)
+
+    def close(self) -> None:
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+
+
+def get_staged_uploads() -> StagedUploads:
+    global staged_uploads
+    if staged_uploads is None:
+        staged_uploads = StagedUploads(
+            settings.receipt_staging_dir,
+            settings.receipt_upload_max_attempts,
+            settings.receipt_upload_retry_delay,
+        )
+    return staged_uploads
+
+
+async def _upload_worker(uploads: StagedUploads) -> None:
+    while True:
+        receipt_id, attempt = await uploads.next()
+        try:
+            await uploads.upload(receipt_id, attempt)
+        except Exception as e:
+            print(f"Staged upload worker error: {e}")
+
+
+async def start_upload_workers() -> None:
+    if settings.receipt_upload_mode != "background":
+        return
+    uploads = get_staged_uploads()
+    await asyncio.to_thread(uploads.recover)
+    for _ in range(settings.receipt_upload_workers):
+        upload_workers.append(asyncio.create_task(_upload_worker(uploads)))
+
+
+async def stop_upload_workers() -> None:
+    for task in upload_workers:
+        task.cancel()
+    await asyncio.gather(*upload_workers, return_exceptions=True)
+    upload_workers.clear()
+    if staged_uploads is not None:
+        staged_uploads.close()
@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+from config import get_settings
+from services import cloudinary_service
+from services.cloudinary_service import UploadResult
+
+settings = get_settings()
+
+image_store: Optional["ImageStore"] = None
+
+
+class ImageStore(ABC):
+    @abstractmethod
+    async def upload(self, image_data: bytes) -> UploadResult: ...
+
+    @abstractmethod
+    async def delete(self, public_id: str) -> None: ...
+
+    async def delete_many(self, public_ids: list[str]) -> int:
+        """Delete several images, returning how many were deleted."""
+        await asyncio.gather(*(self.delete(public_id) for public_id in public_ids))
+        return len(public_ids)
+
+    async def close(self) -> None:
+        pass
+
+
+class CloudinaryImageStore(ImageStore):
+    async def upload(self, image_data: bytes) -> UploadResult:
+        return await cloudinary_service.upload_image(image_data)
+
+    async def delete(self, public_id: str) -> None:
+        await cloudinary_service.delete_image(public_id)
+
+    async def delete_many(self, public_ids: list[str]) -> int:
+        return await cloudinary_service.delete_images(public_ids)
+
+    async def close(self) -> None:
+        await cloudinary_service.close_client()
+
+
+class LocalImageStore(ImageStore):
+    # Stand-in for Cloudinary in development and benchmarks. delay_ms
+    # simulates the network round trip of a real upload.
+    def __init__(self, root: str, delay_ms: float = 0):
+        self.root = Path(root)
+        self.delay = delay_ms / 1000
+
+    async def upload(self, image_data: bytes) -> UploadResult:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        public_id = uuid.uuid4().hex
+        path = self.root / f"{public_id}.jpg"
+        await asyncio.to_thread(self._write, path, image_data)
+        return UploadResult(url=path.resolve().as_uri(), public_id=public_id)
+
+    async def delete(self, public_id: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        (self.root / f"{public_id}.jpg").unlink(missing_ok=True)
+
+    def _write(self, path: Path, image_data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(image_data)
+
+
+class MemoryImageStore(ImageStore):
+    # Keeps uploads in a dict; for tests and benchmarks that should not touch
+    # the disk or the network
+    def __init__(self, delay_ms: float = 0):
+        self.delay = delay_ms / 1000
+        self.images: dict[str, bytes] = {}
+
+    async def upload(self, image_data: bytes) -> UploadResult:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        public_id = uuid.uuid4().hex
+        self.images[public_id] = image_data
+        return UploadResult(url=f"memory://{public_id}", public_id=public_id)
+
+    async def delete(self, public_id: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.images.pop(public_id, None)
+
+
+def get_image_store() -> ImageStore:
+    global image_store
+    if image_store is None:
+        if settings.image_store == "memory":
+            image_store = MemoryImageStore(settings.local_image_store_delay_ms)
+        elif settings.image_store == "local":
+            image_store = LocalImageStore(
+                settings.local_image_store_dir, settings.local_image_store_delay_ms
+            )
+        else:
+            image_store = CloudinaryImageStore()
+    return image_store
+
+
+async def close_image_store() -> None:
+    global image_store
+    if image_store is not None:
+        await image_store.close()
+        image_store = None
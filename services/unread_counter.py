@@ -0,0 +1,225 @@
+"""Per-user unread notification counts, kept in UnreadCounter.
+
+    python -m services.unread_counter --reconcile [--batch-size 1000]
+
+The counter row changes in the same transaction as the notification rows,
+so GET /api/notifications/unread-count reads one row (or the in-process
+cache) instead of counting. Reconciliation recounts from Notification and
+fixes any drift; the API also runs it every UNREAD_COUNTER_RECONCILE_INTERVAL
+seconds.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import get_settings
+from database import connect_db, db, disconnect_db
+from services import metrics
+
+settings = get_settings()
+
+counter_cache: Optional["UnreadCountCache"] = None
+reconcile_task: Optional[asyncio.Task] = None
+
+BUMP_COUNTER = """
+UPDATE "UnreadCounter"
+SET "count" = GREATEST("count" + $2::int, 0), "updatedAt" = NOW()
+WHERE "userId" = $1
+"""
+
+# Only when BUMP_COUNTER found no row. The full count already includes the
+# change made by the calling transaction; if a concurrent bump created the
+# row first, the conflict adds this change to it instead.
+CREATE_COUNTER = """
+INSERT INTO "UnreadCounter" ("userId", "count", "updatedAt")
+SELECT $1, COUNT(*), NOW() FROM "Notification" WHERE "userId" = $1 AND NOT "read"
+ON CONFLICT ("userId") DO UPDATE
+SET "count" = GREATEST("UnreadCounter"."count" + $2::int, 0), "updatedAt" = NOW()
+"""
+
+# For users that had notifications before the counter existed
+BACKFILL_COUNTER = """
+INSERT INTO "UnreadCounter" ("userId", "count", "updatedAt")
+SELECT $1, COUNT(*), NOW() FROM "Notification" WHERE "userId" = $1 AND NOT "read"
+ON CONFLICT ("userId") DO NOTHING
+"""
+
+CREATE_MISSING_COUNTERS = """
+INSERT INTO "UnreadCounter" ("userId", "count", "updatedAt")
+SELECT "id", 0, NOW() FROM "User" WHERE "id" = ANY($1::text[])
+ON CONFLICT ("userId") DO NOTHING
+"""
+
+LOCK_COUNTERS = """
+SELECT "userId" FROM "UnreadCounter" WHERE "userId" = ANY($1::text[]) FOR UPDATE
+"""
+
+# Run after LOCK_COUNTERS in the same transaction: a notification committed
+# before the lock is in the count, and one committed after it bumps the
+# fixed value once the lock is released
+FIX_COUNTERS = """
+UPDATE "UnreadCounter" c
+SET "count" = s."count", "updatedAt" = NOW()
+FROM (
+    SELECT u."id" AS "userId", COUNT(n."id") AS "count"
+    FROM "User" u
+    LEFT JOIN "Notification" n ON n."userId" = u."id" AND NOT n."read"
+    WHERE u."id" = ANY($1::text[])
+    GROUP BY u."id"
+) s
+WHERE c."userId" = s."userId" AND c."count" <> s."count"
+"""
+
+
+class UnreadCountCache:
+    # Bounded LRU of counts with a TTL. Writes in this process drop the
+    # entry; writes from other processes show up once it expires.
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[int]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    def put(self, user_id: str, count: int) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[user_id] = (count, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+
+def get_counter_cache() -> UnreadCountCache:
+    global counter_cache
+    if counter_cache is None:
+        counter_cache = UnreadCountCache(
+            settings.unread_counter_cache_ttl, settings.unread_counter_cache_size
+        )
+    return counter_cache
+
+
+async def bump_unread(client, user_id: str, delta: int) -> None:
+    """Add delta to the user's count; call with the transaction that changed the rows."""
+    if delta and not await client.execute_raw(BUMP_COUNTER, user_id, delta):
+        await client.execute_raw(CREATE_COUNTER, user_id, delta)
+
+
+async def create_notification(data: dict):
+    async with db.tx() as transaction:
+        notification = await transaction.notification.create(data=data)
+        await bump_unread(transaction, data["userId"], 1)
+    get_counter_cache().invalidate(data["userId"])
+    return notification
+
+
+async def mark_read(user_id: str, notification_id: Optional[str] = None) -> int:
+    # Only rows that were unread are counted, so marking the same
+    # notification twice, even concurrently, decrements once
+    where = {"userId": user_id, "read": False}
+    if notification_id is not None:
+        where["id"] = notification_id
+    async with db.tx() as transaction:
+        updated = await transaction.notification.update_many(where=where, data={"read": True})
+        await bump_unread(transaction, user_id, -updated)
+    get_counter_cache().invalidate(user_id)
+    return updated
+
+
+async def get_unread_count(user_id: str) -> int:
+    cache = get_counter_cache()
+    count = cache.get(user_id)
+    if count is not None:
+        metrics.incr("unread_counter.cache_hits")
+        return count
+
+    metrics.incr("unread_counter.cache_misses")
+    counter = await db.unreadcounter.find_unique(where={"userId": user_id})
+    if counter is None:
+        await db.execute_raw(BACKFILL_COUNTER, user_id)
+        counter = await db.unreadcounter.find_unique(where={"userId": user_id})
+    count = counter.count if counter else 0
+    cache.put(user_id, count)
+    return count
+
+
+async def reconcile_unread_counters(batch_size: Optional[int] = None) -> dict:
+    batch_size = batch_size or settings.unread_counter_reconcile_batch_size
+    start = time.perf_counter()
+    users = fixed = 0
+    last_id = ""
+    while True:
+        batch = await db.user.find_many(
+            where={"id": {"gt": last_id}}, order={"id": "asc"}, take=batch_size
+        )
+        if not batch:
+            break
+        user_ids = [user.id for user in batch]
+        last_id = user_ids[-1]
+
+        async with db.tx() as transaction:
+            await transaction.execute_raw(CREATE_MISSING_COUNTERS, user_ids)
+            await transaction.query_raw(LOCK_COUNTERS, user_ids)
+            fixed += await transaction.execute_raw(FIX_COUNTERS, user_ids)
+        for user_id in user_ids:
+            get_counter_cache().invalidate(user_id)
+        users += len(user_ids)
+
+    metrics.incr("unread_counter.drift_fixed", fixed)
+    return {"users": users, "fixed": fixed, "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def _reconcile_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.unread_counter_reconcile_interval)
+        try:
+            result = await reconcile_unread_counters()
+            if result["fixed"]:
+                print(f"Unread counter reconciliation: {result}")
+        except Exception as e:
+            print(f"Unread counter reconciliation error: {e}")
+
+
+async def start_unread_reconciliation() -> None:
+    global reconcile_task
+    if settings.unread_counter_reconcile_interval > 0:
+        reconcile_task = asyncio.create_task(_reconcile_loop())
+
+
+async def stop_unread_reconciliation() -> None:
+    global reconcile_task
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+        await asyncio.gather(reconcile_task, return_exceptions=True)
+        reconcile_task = None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reconcile", action="store_true")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args()
+    if not args.reconcile:
+        parser.error("nothing to do; pass --reconcile")
+
+    await connect_db()
+    try:
+        result = await reconcile_unread_counters(args.batch_size)
+    finally:
+        await disconnect_db()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
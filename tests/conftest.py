@@ -0,0 +1,24 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings are required at import time; the tests never reach these services
+for name in (
+    "DATABASE_URL",
+    "JWT_SECRET",
+    "CLOUDINARY_CLOUD_NAME",
+    "CLOUDINARY_API_KEY",
+    "CLOUDINARY_API_SECRET",
+):
+    os.environ.setdefault(name, "test")
+
+# The tests replace db wherever it is used, so a checkout without
+# `prisma generate` can still import the modules under test
+try:
+    import database  # noqa: F401
+except RuntimeError:
+    sys.modules["database"] = types.SimpleNamespace(
+        db=None, connect_db=None, disconnect_db=None
+    )
@@ -0,0 +1,23 @@
+import base64
+import binascii
+
+import pytest
+
+from services.ocr_service import decode_image_base64
+
+IMAGE = bytes(range(256)) * 4
+
+
+def test_plain_base64():
+    assert decode_image_base64(base64.b64encode(IMAGE).decode()) == IMAGE
+
+
+def test_data_url_prefix_is_skipped():
+    encoded = "data:image/jpeg;base64," + base64.b64encode(IMAGE).decode()
+
+    assert decode_image_base64(encoded) == IMAGE
+
+
+def test_invalid_base64():
+    with pytest.raises(binascii.Error):
+        decode_image_base64("abc")
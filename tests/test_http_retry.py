@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.http_retry import send_with_retry
+
+
+def run(responses, attempts=3, **kwargs):
+    # responses: one status code or exception per attempt, in order
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        outcome = responses[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"attempt": len(calls)})
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_with_retry(
+                client,
+                lambda: client.build_request("POST", "https://api.test/send", json={"n": len(calls)}),
+                attempts,
+                0,
+                **kwargs,
+            )
+
+    return asyncio.run(send()), calls
+
+
+def test_retries_until_success():
+    response, calls = run([503, httpx.ConnectError("refused"), 200])
+
+    assert response.json() == {"attempt": 3}
+    # Built afresh for every attempt
+    assert [call.content for call in calls] == [b'{"n":0}', b'{"n":1}', b'{"n":2}']
+
+
+def test_last_retryable_status_is_raised():
+    with pytest.raises(httpx.HTTPStatusError) as excinfo:
+        run([429, 502, 503])
+
+    assert excinfo.value.response.status_code == 503
+
+
+def test_last_transport_error_is_raised():
+    with pytest.raises(httpx.ReadTimeout):
+        run([httpx.ConnectError("refused"), httpx.ReadTimeout("slow")], attempts=2)
+
+
+def test_other_errors_are_not_retried():
+    with pytest.raises(httpx.HTTPStatusError):
+        run([400, 200])
+
+
+def test_retry_statuses_can_be_narrowed():
+    with pytest.raises(httpx.HTTPStatusError):
+        run([408, 200], retry_statuses={503})
+
+
+def test_semaphore_is_held_for_all_attempts():
+    semaphore = asyncio.Semaphore(1)
+    locked = []
+
+    def handler(request):
+        locked.append(semaphore.locked())
+        return httpx.Response(500 if len(locked) == 1 else 200)
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_with_retry(
+                client, lambda: client.build_request("GET", "https://api.test/"), 3, 0,
+                semaphore=semaphore,
+            )
+
+    assert asyncio.run(send()).status_code == 200
+    assert locked == [True, True]
+    assert not semaphore.locked()
@@ -0,0 +1,44 @@
+import io
+
+from PIL import Image
+
+from services.image_renditions import RenditionOptions, make_renditions
+
+
+def jpeg(size: tuple[int, int], **save_args) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, "JPEG", **save_args)
+    return buffer.getvalue()
+
+
+def open_jpeg(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    assert image.format == "JPEG"
+    return image
+
+
+def test_sizes_keep_aspect_ratio():
+    renditions = make_renditions(
+        jpeg((3000, 4000)), RenditionOptions(display_max_side=1280, thumbnail_max_side=320)
+    )
+
+    assert open_jpeg(renditions["display"]).size == (960, 1280)
+    assert open_jpeg(renditions["thumbnail"]).size == (240, 320)
+
+
+def test_small_image_is_not_upscaled():
+    renditions = make_renditions(jpeg((200, 100)), RenditionOptions())
+
+    assert open_jpeg(renditions["display"]).size == (200, 100)
+    assert open_jpeg(renditions["thumbnail"]).size == (200, 100)
+
+
+def test_exif_orientation_is_applied_and_dropped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    exif[0x010F] = "Phone"  # Make
+    renditions = make_renditions(jpeg((400, 300), exif=exif), RenditionOptions())
+
+    display = open_jpeg(renditions["display"])
+    assert display.size == (300, 400)
+    assert not display.getexif()
@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager, so the lifespan (database, workers)
+    # does not run
+    return TestClient(main.app)
+
+
+def test_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "")
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_requires_the_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "s3cret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services import notification_outbox
+from services.notification_outbox import NotificationOutbox
+
+
+class FakeOutboxTable:
+    def __init__(self):
+        self.updates = []
+        self.deletes = []
+
+    async def update_many(self, where, data):
+        self.updates.append((where["id"]["in"], data))
+        return len(where["id"]["in"])
+
+    async def delete_many(self, where):
+        self.deletes.append(where)
+        return 3
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeOutboxTable()
+    monkeypatch.setattr(notification_outbox, "db", SimpleNamespace(notificationoutbox=table))
+    return table
+
+
+def make_outbox(max_attempts=5, retry_delay=5.0) -> NotificationOutbox:
+    return NotificationOutbox(
+        batch_size=100,
+        poll_interval=1.0,
+        max_attempts=max_attempts,
+        retry_delay=retry_delay,
+        lease_seconds=120,
+        receipt_delay=900,
+        receipt_batch_size=100,
+        dead_retention_days=7,
+    )
+
+
+def row(id, user="u1", group="g1", token="ExponentPushToken[a]", type="new_expense", data=None):
+    return {
+        "id": id,
+        "userId": user,
+        "groupId": group,
+        "pushToken": token,
+        "title": "t",
+        "body": "b",
+        "data": data if data is not None else {"type": type},
+        "attempts": 1,
+    }
+
+
+def test_coalesce_groups_new_expenses_per_user_group_and_token():
+    rows = [
+        row("1"),
+        row("2"),
+        row("3", token="ExponentPushToken[b]"),
+        row("4", group="g2"),
+        row("5", user="u2"),
+        row("6"),
+    ]
+
+    batches = make_outbox()._coalesce(rows)
+
+    assert [[r["id"] for r in batch] for batch in batches] == [
+        ["1", "2", "6"], ["3"], ["4"], ["5"],
+    ]
+
+
+def test_coalesce_keeps_other_notifications_apart():
+    rows = [
+        row("1", type="settlement"),
+        row("2", type="settlement"),
+        row("3", group=None),
+        row("4", group=None),
+    ]
+
+    batches = make_outbox()._coalesce(rows)
+
+    assert [[r["id"] for r in batch] for batch in batches] == [["1"], ["2"], ["3"], ["4"]]
+
+
+def test_coalesce_parses_json_text():
+    rows = [row("1", data='{"type": "new_expense", "amount": 10}'), row("2")]
+
+    batches = make_outbox()._coalesce(rows)
+
+    assert len(batches) == 1
+    assert batches[0][0]["data"] == {"type": "new_expense", "amount": 10}
+
+
+@pytest.mark.parametrize("attempts", [1, 2, 4])
+def test_retry_backs_off_exponentially_with_jitter(table, attempts):
+    rows = [dict(row(str(i)), attempts=attempts) for i in range(3)]
+
+    before = datetime.now(timezone.utc)
+    asyncio.run(make_outbox(retry_delay=5.0)._retry(rows, "DeviceNotRegistered?"))
+    after = datetime.now(timezone.utc)
+
+    [(ids, data)] = table.updates
+    assert ids == ["0", "1", "2"]
+    assert data["status"] == "pending"
+    assert data["error"] == "DeviceNotRegistered?"
+    base = 5.0 * 2 ** (attempts - 1)
+    assert 0.5 * base <= (data["availableAt"] - before).total_seconds()
+    assert (data["availableAt"] - after).total_seconds() <= base
+
+
+def test_retry_dead_letters_rows_out_of_attempts(table):
+    rows = [dict(row("1"), attempts=5), dict(row("2"), attempts=2)]
+
+    asyncio.run(make_outbox(max_attempts=5)._retry(rows, "boom"))
+
+    dead = [(ids, data) for ids, data in table.updates if data["status"] == "dead"]
+    retried = [(ids, data) for ids, data in table.updates if data["status"] == "pending"]
+    assert dead == [(["1"], {"status": "dead", "error": "boom"})]
+    assert [ids for ids, _ in retried] == [["2"]]
+
+
+def test_prune_dead_deletes_only_expired_dead_rows(table):
+    outbox = make_outbox()
+    outbox.dead_retention_days = 7
+
+    before = datetime.now(timezone.utc)
+    assert asyncio.run(outbox.prune_dead()) == 3
+
+    [where] = table.deletes
+    assert where["status"] == "dead"
+    age = before - where["updatedAt"]["lt"]
+    assert timedelta(days=7) - timedelta(seconds=5) <= age <= timedelta(days=7)
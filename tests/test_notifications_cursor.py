@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from routers.notifications import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000, tzinfo=timezone.utc)
+    cursor = encode_cursor(SimpleNamespace(createdAt=created_at, id="cl|x9"))
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, "cl|x9")
+
+
+@pytest.mark.parametrize("cursor", ["***", "bm8tc2VwYXJhdG9y", "bm90LWEtZGF0ZXxpZA"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+
+    assert excinfo.value.status_code == 400
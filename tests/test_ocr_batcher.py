@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from services import ocr_service
+from services.ocr_service import OcrBatcher
+
+
+class RecordingBatcher(OcrBatcher):
+    # Runs batches without the process pool; each one holds its worker until
+    # release is set
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches: list[list[bytes]] = []
+        self.release = asyncio.Event()
+
+    async def _run_batch(self, batch):
+        self.batches.append([image for image, _, _ in batch])
+        await self.release.wait()
+        for image, future, _ in batch:
+            future.set_result([image.decode()])
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    def set_workers(count: int):
+        monkeypatch.setattr(ocr_service.settings, "ocr_workers", count)
+
+    return set_workers
+
+
+def test_idle_workers_split_the_queue_without_waiting(workers):
+    workers(2)
+
+    async def run():
+        batcher = RecordingBatcher(max_batch_size=8, max_wait_ms=10_000)
+        batcher.release.set()
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(f"img{i}".encode()) for i in range(4))), 1
+        )
+        batcher.close()
+        return batcher.batches, results
+
+    batches, results = asyncio.run(run())
+
+    assert batches == [[b"img0", b"img1"], [b"img2", b"img3"]]
+    assert results == [["img0"], ["img1"], ["img2"], ["img3"]]
+
+
+def test_busy_workers_fill_batches_up_to_max_size(workers):
+    workers(1)
+
+    async def run():
+        batcher = RecordingBatcher(max_batch_size=4, max_wait_ms=50)
+        first = asyncio.create_task(batcher.submit(b"first"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        # The only worker is busy with "first"; the rest queue up behind it
+        rest = [asyncio.create_task(batcher.submit(f"img{i}".encode())) for i in range(6)]
+        await asyncio.sleep(0.2)
+        batches = [len(batch) for batch in batcher.batches]
+        batcher.release.set()
+        results = await asyncio.gather(first, *rest)
+        batcher.close()
+        return batches, results
+
+    batches, results = asyncio.run(run())
+
+    assert batches == [1, 4, 2]
+    assert results == [["first"]] + [[f"img{i}"] for i in range(6)]
+
+
+def test_results_follow_submission_order(workers):
+    workers(1)
+
+    async def run():
+        batcher = RecordingBatcher(max_batch_size=16, max_wait_ms=20)
+        batcher.release.set()
+        results = await asyncio.gather(*(batcher.submit(str(i).encode()) for i in range(10)))
+        batcher.close()
+        return results
+
+    assert asyncio.run(run()) == [[str(i)] for i in range(10)]
+
+
+def test_run_batch_errors_reach_every_caller(workers, monkeypatch):
+    workers(1)
+    monkeypatch.setattr(ocr_service, "get_ocr_pool", lambda: None)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+
+        async def fail(*args):
+            raise RuntimeError("OCR crashed")
+
+        monkeypatch.setattr(loop, "run_in_executor", lambda *args: fail())
+        batcher = OcrBatcher(max_batch_size=4, max_wait_ms=10)
+        results = await asyncio.gather(
+            batcher.submit(b"a"), batcher.submit(b"b"), return_exceptions=True
+        )
+        batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert [str(result) for result in results] == ["OCR crashed", "OCR crashed"]
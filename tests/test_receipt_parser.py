@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.bench_receipt_parser import load_corpus
+from services.receipt_parser import parse_receipt_text
+
+
+@pytest.mark.parametrize(
+    "lines,expected", [(lines, expected) for _, lines, expected in load_corpus()],
+    ids=[name for name, _, _ in load_corpus()],
+)
+def test_corpus(lines, expected):
+    assert parse_receipt_text(lines).model_dump(exclude={"mock", "profile"}) == expected
+
+
+def test_quantity_and_simple_items():
+    receipt = parse_receipt_text(["Phở bò tái x2 90,000đ", "Trà đá 5.000", "Tổng cộng: 95,000"])
+
+    assert [(item.name, item.quantity, item.price) for item in receipt.items] == [
+        ("Phở bò tái", 2, 90000),
+        ("Trà đá", 1, 5000),
+    ]
+    assert receipt.total == 95000
+
+
+def test_total_defaults_to_sum_of_items():
+    receipt = parse_receipt_text(["Cà phê sữa 25.000", "Bánh mì 20.000"])
+
+    assert receipt.total == 45000